@@ -1,8 +1,15 @@
 from collections import defaultdict
+import os
 import random
+import sys
+# The event sinks are shared with the ex09 robots and live there
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'ex09'))
+from event_sink import ConsoleSink, sink_from_env
 class Robot:
-    def __init__(self):
+    def __init__(self, sink=None):
         self.platform = ['white', 'black']
+        # Messages and step events go to the sink (console output by default)
+        self.sink = sink or ConsoleSink()
         self.position = 0  # Start on the left side of the platform
         self.last_color = None
         self.last_move = None
@@ -24,12 +31,14 @@ class Robot:
             self.last_color = self.platform[self.position]
             self.last_move = 'left'
             #print("The robot is already at the leftmost position.")
+        self.sink.record(action=self.last_move, last_color=self.last_color, position=self.position,
+                         tile=self.platform[self.position])
 
-        print(f"Last state: {self.last_color}, Action taken: {self.last_move}, Result color: {self.platform[self.position]}")
-        print(f"|-----------------|")
-        print(f"|  BOT  ||        |")
-        print(f"| White || Black  |")
-        print(f"****************************************************************************")
+        self.sink.log(f"Last state: {self.last_color}, Action taken: {self.last_move}, Result color: {self.platform[self.position]}")
+        self.sink.log(f"|-----------------|")
+        self.sink.log(f"|  BOT  ||        |")
+        self.sink.log(f"| White || Black  |")
+        self.sink.log(f"****************************************************************************")
     def move_right(self):
         if self.position < len(self.platform) - 1:
             self.histograms[(self.platform[self.position], 'right')][self.platform[self.position + 1]] += 1
@@ -41,25 +50,27 @@ class Robot:
             self.last_color = self.platform[self.position]
             self.last_move = 'right'
             #print("The robot is already at the rightmost position.")
-        print(f"Last state: {self.last_color}, Action taken: {self.last_move}, Result color: {self.platform[self.position]}")
-        print(f"|-----------------|")
-        print(f"|       ||   BOT  |")
-        print(f"| White || Black  |")
-        print(f"****************************************************************************")
+        self.sink.record(action=self.last_move, last_color=self.last_color, position=self.position,
+                         tile=self.platform[self.position])
+        self.sink.log(f"Last state: {self.last_color}, Action taken: {self.last_move}, Result color: {self.platform[self.position]}")
+        self.sink.log(f"|-----------------|")
+        self.sink.log(f"|       ||   BOT  |")
+        self.sink.log(f"| White || Black  |")
+        self.sink.log(f"****************************************************************************")
 
 
     def report_position(self):
-        print(f"The robot is on the {self.platform[self.position]} side of the platform.")
+        self.sink.log(f"The robot is on the {self.platform[self.position]} side of the platform.")
         if self.last_color:
-            print(f"The last color was {self.last_color}.")
+            self.sink.log(f"The last color was {self.last_color}.")
         if self.last_move:
-            print(f"The last move was {self.last_move}.")
+            self.sink.log(f"The last move was {self.last_move}.")
     
     def print_histograms(self):
         for (current_color, action), histogram in self.histograms.items():
-            print(f"Histogram for {current_color} tile + action {action}:")
+            self.sink.log(f"Histogram for {current_color} tile + action {action}:")
             for next_color, count in histogram.items():
-                print(f"  {next_color}: {count}")
+                self.sink.log(f"  {next_color}: {count}")
 
     def choose_action(self, current_color):
         # Get counts for both colors for both actions
@@ -80,7 +91,9 @@ class Robot:
             return random.choice(['left', 'right'])
     
 # Test the Robot class
-robot = Robot()
+# EVENT_SINK=silent|ring|ndjson:<path> replaces the console output
+sink = sink_from_env()
+robot = Robot(sink)
 for i in range(10):
     current_color = robot.platform[robot.position]
     action = robot.choose_action(current_color)
@@ -89,4 +102,5 @@ for i in range(10):
     else:
         robot.move_right()
 
-robot.print_histograms()
\ No newline at end of file
+robot.print_histograms()
+sink.close()
\ No newline at end of file
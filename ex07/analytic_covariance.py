@@ -0,0 +1,84 @@
+import numpy as np
+import odometry_engine
+
+
+def propagate(velocity, time_step, total_time, sigma_right, sigma_left, circular=False,
+              b=odometry_engine.AXIS_LENGTH, radius=odometry_engine.RADIUS):
+    """Analytic mode: push the pose mean and covariance through the linearized motion model.
+
+    Uses the same kinematics as the sampling engine with Gaussian wheel noise
+    `sigma_right`/`sigma_left`, at O(steps) cost. Returns `(means, covariances)` of
+    the x/y/theta pose after every step, shapes `(steps, 3)` and `(steps, 3, 3)`.
+    """
+    steps = odometry_engine.num_steps(time_step, total_time)
+    vr, vl = odometry_engine.wheel_velocities(velocity, circular, b, radius)
+    v = 0.5 * (vr + vl)
+    wheel_noise = np.diag([sigma_right ** 2, sigma_left ** 2])
+
+    means = np.zeros((steps, 3))
+    covariances = np.zeros((steps, 3, 3))
+    mean = np.zeros(3)
+    covariance = np.zeros((3, 3))
+    for k in range(steps):
+        theta = mean[2]
+        cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+        # Jacobian of the step with respect to the pose before it
+        jacobian_pose = np.array([[1.0, 0.0, -v * time_step * sin_theta],
+                                  [0.0, 1.0, v * time_step * cos_theta],
+                                  [0.0, 0.0, 1.0]])
+        # Jacobian of the step with respect to the wheel velocities (vr, vl)
+        jacobian_wheels = np.array([[0.5 * time_step * cos_theta, 0.5 * time_step * cos_theta],
+                                    [0.5 * time_step * sin_theta, 0.5 * time_step * sin_theta],
+                                    [time_step / b, -time_step / b]])
+        covariance = (jacobian_pose @ covariance @ jacobian_pose.T
+                      + jacobian_wheels @ wheel_noise @ jacobian_wheels.T)
+        mean = mean + np.array([v * time_step * cos_theta,
+                                v * time_step * sin_theta,
+                                (1/b) * (vr - vl) * time_step])
+        means[k] = mean
+        covariances[k] = covariance
+    return means, covariances
+
+
+def endpoint_distribution(velocity, time_step, total_time, sigma_right, sigma_left, circular=False):
+    # Mean (2,) and covariance (2, 2) of the final x, y position
+    means, covariances = propagate(velocity, time_step, total_time, sigma_right, sigma_left, circular)
+    return means[-1, :2], covariances[-1, :2, :2]
+
+
+def covariance_ellipse(covariance, n_std=2.0):
+    # Width, height and angle (degrees) of the n_std ellipse of a 2x2 covariance
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    eigenvalues = np.maximum(eigenvalues, 0.0)
+    angle = np.degrees(np.arctan2(eigenvectors[1, 1], eigenvectors[0, 1]))
+    width, height = 2 * n_std * np.sqrt(eigenvalues[::-1])
+    return width, height, angle
+
+
+def overlay_ellipses(ax, mean, covariance, n_stds=(1, 2, 3), color='red', **kwargs):
+    # Draw the analytic confidence ellipses on top of a Monte Carlo histogram
+    from matplotlib.patches import Ellipse
+
+    patches = []
+    for n_std in n_stds:
+        width, height, angle = covariance_ellipse(covariance, n_std)
+        patch = Ellipse(mean, width, height, angle=angle, fill=False, edgecolor=color, **kwargs)
+        ax.add_patch(patch)
+        patches.append(patch)
+    ax.plot(*mean, marker='+', color=color)
+    return patches
+
+
+def agreement(positions, mean, covariance):
+    """Relative mismatch between Monte Carlo endpoints and the analytic distribution.
+
+    Returns `(mean_error, covariance_error)`: the mean offset in units of the analytic
+    standard deviation along it, and the relative Frobenius error of the covariance.
+    Small values mean the sampling budget for that setup can be cut.
+    """
+    sample_mean = positions.mean(axis=0)
+    sample_covariance = np.cov(positions.T)
+    offset = sample_mean - mean
+    mean_error = float(np.sqrt(offset @ np.linalg.pinv(covariance) @ offset))
+    covariance_error = float(np.linalg.norm(sample_covariance - covariance) / np.linalg.norm(covariance))
+    return mean_error, covariance_error
@@ -1,45 +1,13 @@
-import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+import odometry_engine
+import analytic_covariance
 
 def simulate_robot(num_runs, velocity, time_step, total_time, sigma_right, sigma_left, circular=False):
-    b = 1.0  # axis length
-    radius = 5.0  # Radius for circular path
-    positions = np.zeros((num_runs, 2))  # x, y positions
-    odometries = np.zeros((num_runs, 2))  # x, y odometry
-
-    for i in range(num_runs):
-        x, y, theta = 0, 0, 0  # initial pose
-        odom_x, odom_y = 0, 0  # initial odometry readings
-
-        for t in np.arange(0, total_time, time_step):
-            if circular:
-                vr = velocity  # constant right velocity
-                vl = velocity * (1 - b / radius)  # reduced left velocity for turning
-            else:
-                vr = velocity  # constant right velocity
-                vl = velocity  # constant left velocity
-
-            # Add noise to velocities
-            vr += np.random.normal(0, sigma_right)
-            vl += np.random.normal(0, sigma_left)
-
-            # Kinematic model for actual movement
-            delta_x = 0.5 * (vr + vl) * np.cos(theta) * time_step
-            delta_y = 0.5 * (vr + vl) * np.sin(theta) * time_step
-            delta_theta = (1/b) * (vr - vl) * time_step
-
-            x += delta_x
-            y += delta_y
-            theta += delta_theta
-
-            # Perfect odometry (no error model here)
-            odom_x += delta_x
-            odom_y += delta_y
-
-        positions[i] = [x, y]
-        odometries[i] = [odom_x, odom_y]
-
-    return positions, odometries
+    # All runs are moved forward together by the vectorized engine.
+    # Perfect odometry (no error model here), so odometries equal the positions.
+    return odometry_engine.simulate_robot(num_runs, velocity, time_step, total_time,
+                                          sigma_right, sigma_left, circular=circular)
 
 # Simulation parameters
 num_runs = 100
@@ -55,6 +23,14 @@ straight_positions, straight_odometries = simulate_robot(num_runs, velocity, tim
 # Simulate circular movement
 circular_positions, circular_odometries = simulate_robot(num_runs, velocity, time_step, total_time, sigma_right, sigma_left, circular=True)
 
+# Analytic mode: mean and covariance of the final position from the linearized motion model
+straight_mean, straight_cov = analytic_covariance.endpoint_distribution(velocity, time_step, total_time, sigma_right, sigma_left)
+circular_mean, circular_cov = analytic_covariance.endpoint_distribution(velocity, time_step, total_time, sigma_right, sigma_left, circular=True)
+for name, positions, mean, cov in [('Straight', straight_positions, straight_mean, straight_cov),
+                                   ('Circular', circular_positions, circular_mean, circular_cov)]:
+    mean_error, cov_error = analytic_covariance.agreement(positions, mean, cov)
+    print(f"{name}: analytic vs sampling mean offset {mean_error:.3f} sigma, covariance error {cov_error:.1%}")
+
 # Plotting results for straight line and circular movements
 plt.figure(figsize=(12, 12))
 
@@ -62,6 +38,7 @@ plt.figure(figsize=(12, 12))
 plt.subplot(2, 2, 1)
 plt.hist2d(straight_positions[:, 0], straight_positions[:, 1], bins=(50, 50), cmap='viridis')
 plt.colorbar(label='Counts in bin')
+analytic_covariance.overlay_ellipses(plt.gca(), straight_mean, straight_cov)
 plt.title('Actual Positions (Straight Line)')
 plt.xlabel('X Position')
 plt.ylabel('Y Position')
@@ -78,6 +55,7 @@ plt.ylabel('Y Position')
 plt.subplot(2, 2, 3)
 plt.hist2d(circular_positions[:, 0], circular_positions[:, 1], bins=(50, 50), cmap='viridis')
 plt.colorbar(label='Counts in bin')
+analytic_covariance.overlay_ellipses(plt.gca(), circular_mean, circular_cov)
 plt.title('Actual Positions (Circular Path)')
 plt.xlabel('X Position')
 plt.ylabel('Y Position')
@@ -92,4 +70,5 @@ plt.ylabel('Y Position')
 
 plt.tight_layout()
 plt.savefig("ex07/ex07_b.png")
-plt.show()
+if matplotlib.get_backend().lower() != 'agg':  # headless runs (MPLBACKEND=Agg) only save
+    plt.show()
@@ -0,0 +1,98 @@
+import html
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+# Figure/Agg only: pyplot (and any GUI backend) is never imported here
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# One figure per worker process, reused for every cell it renders
+_figure = None
+
+
+def sweep_figure():
+    # Two histogram axes (positions, odometries), each with its own colorbar axes
+    global _figure
+    if _figure is None:
+        fig = Figure(figsize=(12, 6))
+        FigureCanvasAgg(fig)
+        axes = []
+        for panel in fig.add_gridspec(1, 2, wspace=0.3):
+            grid = panel.subgridspec(1, 2, width_ratios=[20, 1], wspace=0.05)
+            axes += [fig.add_subplot(grid[0, 0]), fig.add_subplot(grid[0, 1])]
+        _figure = (fig, axes)
+    return _figure
+
+
+def render_cell(summary, path):
+    """Draw the position and odometry grids of one cached sweep cell into a PNG."""
+    fig, (ax_positions, cax_positions, ax_odometries, cax_odometries) = sweep_figure()
+    for ax in (ax_positions, cax_positions, ax_odometries, cax_odometries):
+        ax.cla()
+
+    for ax, cax, name, title in ((ax_positions, cax_positions, 'positions', 'Actual Positions'),
+                                 (ax_odometries, cax_odometries, 'odometries', 'Odometry Readings')):
+        grid = summary[name]
+        mesh = ax.pcolormesh(grid['x_edges'], grid['y_edges'], np.asarray(grid['counts']).T, cmap='viridis')
+        fig.colorbar(mesh, cax=cax, label='Counts in bin')
+        ax.set_title(f'Histogram of {title}')
+        ax.set_xlabel('X Position')
+        ax.set_ylabel('Y Position')
+
+    fig.suptitle(cell_caption(summary['params']))
+    fig.savefig(path)
+    return path
+
+
+def cell_caption(params):
+    return ', '.join(f'{name}={value}' for name, value in sorted(params.items()) if value is not None)
+
+
+def _render_batch(batch):
+    return [render_cell(summary, path) for summary, path in batch]
+
+
+def render_sweep(summaries, out_dir='ex07/sweep_figures', workers=None):
+    """Render every sweep cell to `out_dir/<key>.png` in parallel worker processes.
+
+    Cells are split into one batch per worker so each worker builds its figure once.
+    Returns the PNG paths in the order of `summaries`.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    jobs = [(summary, os.path.join(out_dir, f"{summary['key']}.png")) for summary in summaries]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    if workers == 1:
+        return _render_batch(jobs)
+    batches = [jobs[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        rendered = list(pool.map(_render_batch, batches))
+    # Undo the round-robin split
+    paths = [None] * len(jobs)
+    for i, batch_paths in enumerate(rendered):
+        paths[i::workers] = batch_paths
+    return paths
+
+
+def write_html_report(summaries, paths, report_path='ex07/sweep_figures/index.html'):
+    # Single page with every rendered cell, its parameters and its mean/std
+    rows = []
+    for summary, path in zip(summaries, paths):
+        mean = np.round(summary['positions']['mean'], 3)
+        spread = np.round(np.sqrt(np.diag(summary['positions']['covariance'])), 3)
+        src = os.path.relpath(path, os.path.dirname(report_path))
+        rows.append(f'<figure><img src="{html.escape(src)}" width="900">'
+                    f'<figcaption>{html.escape(cell_caption(summary["params"]))}<br>'
+                    f'runs={summary["num_runs"]} mean={mean} std={spread}</figcaption></figure>')
+    with open(report_path, 'w') as f:
+        f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>ex07 sweep</title></head><body>\n')
+        f.write('<h1>ex07 odometry sweep</h1>\n' + '\n'.join(rows) + '\n</body></html>\n')
+    return report_path
+
+
+if __name__ == "__main__":
+    import parameter_sweep
+
+    grid = dict(sigma_right=[0.05, 0.1, 0.2], sigma_left=[0.05, 0.1, 0.2], circular=[False, True])
+    summaries = parameter_sweep.run_sweep(grid)
+    paths = render_sweep(summaries)
+    print(f"Report written to {write_html_report(summaries, paths)}")
@@ -0,0 +1,125 @@
+import numpy as np
+
+# Shared constants of the ex07 differential-drive model
+AXIS_LENGTH = 1.0  # b
+RADIUS = 5.0  # Radius for circular path
+CORRECTION_FACTOR = 0.1  # Gain of the noisy odometry correction (task c)
+
+# Odometry-correction scenarios of task c, in the order of its figure
+NO_CORRECTION, PERFECT_CORRECTION, NOISY_CORRECTION = 0, 1, 2
+SCENARIO_TITLES = ['No Odometry Correction', 'Perfect Odometry Correction', 'Noisy Odometry Correction']
+
+# Run-steps per chunk, keeps every (chunk, steps) work array at ~40 MB of float64
+CHUNK_ELEMENTS = 5_000_000
+
+
+def num_steps(time_step, total_time):
+    # Same step count as the `for t in np.arange(0, total_time, time_step)` loops
+    return len(np.arange(0, total_time, time_step))
+
+
+def wheel_velocities(velocity, circular=False, b=AXIS_LENGTH, radius=RADIUS):
+    vr = velocity  # constant right velocity
+    vl = velocity * (1 - b / radius) if circular else velocity  # reduced left velocity for turning
+    return vr, vl
+
+
+def step_increments(num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+                    circular=False, sigma_o_right=None, sigma_o_left=None, scenario=NO_CORRECTION,
+                    rng=None, b=AXIS_LENGTH, radius=RADIUS):
+    """Per-step motion of `num_runs` robots, all moved forward together.
+
+    Returns `(delta_x, delta_y, theta, odo_delta_x, odo_delta_y)`, each `(num_runs, steps)`,
+    where `theta` is the heading after every step. Without odometry sigmas the odometry
+    is perfect, as in task a/b; with them the three correction scenarios of task c apply.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    steps = num_steps(time_step, total_time)
+    vr, vl = wheel_velocities(velocity, circular, b, radius)
+
+    # All wheel noise for the chunk in one draw, [..., 0] right wheel, [..., 1] left wheel
+    noise = rng.normal(0.0, (sigma_right, sigma_left), size=(num_runs, steps, 2))
+    noisy_vr = vr + noise[..., 0]
+    noisy_vl = vl + noise[..., 1]
+
+    # Heading is a cumulative sum; each step moves along the heading before its own turn
+    theta = np.cumsum((1/b) * (noisy_vr - noisy_vl) * time_step, axis=1)
+    theta_before = np.concatenate((np.zeros((num_runs, 1)), theta[:, :-1]), axis=1)
+    distance = 0.5 * (noisy_vr + noisy_vl) * time_step
+    delta_x = distance * np.cos(theta_before)
+    delta_y = distance * np.sin(theta_before)
+
+    if sigma_o_right is None and sigma_o_left is None:
+        # Perfect odometry (no error model here)
+        return delta_x, delta_y, theta, delta_x, delta_y
+
+    # Odometry with noise, integrated with the heading after the step as in task c
+    odo_noise = rng.normal(0.0, (sigma_o_right or 0.0, sigma_o_left or 0.0), size=(num_runs, steps, 2))
+    odo_distance = 0.5 * ((vr + odo_noise[..., 0]) + (vl + odo_noise[..., 1])) * time_step
+    odo_delta_x = odo_distance * np.cos(theta)
+    odo_delta_y = odo_distance * np.sin(theta)
+
+    if scenario == NOISY_CORRECTION:
+        # x += factor * (odom_x - prev_odo_x) adds a fraction of every odometry step
+        delta_x = delta_x + CORRECTION_FACTOR * odo_delta_x
+        delta_y = delta_y + CORRECTION_FACTOR * odo_delta_y
+    elif scenario == PERFECT_CORRECTION:
+        # Odometry is reset to the true pose after every step
+        odo_delta_x, odo_delta_y = delta_x, delta_y
+    return delta_x, delta_y, theta, odo_delta_x, odo_delta_y
+
+
+def simulate_poses(num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+                   circular=False, sigma_o_right=None, sigma_o_left=None, scenario=NO_CORRECTION,
+                   rng=None, b=AXIS_LENGTH, radius=RADIUS):
+    # Poses after every step, (num_runs, steps, 3) x/y/theta, and odometry (num_runs, steps, 2)
+    delta_x, delta_y, theta, odo_delta_x, odo_delta_y = step_increments(
+        num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+        circular, sigma_o_right, sigma_o_left, scenario, rng, b, radius)
+    poses = np.stack((np.cumsum(delta_x, axis=1), np.cumsum(delta_y, axis=1), theta), axis=-1)
+    odometries = np.stack((np.cumsum(odo_delta_x, axis=1), np.cumsum(odo_delta_y, axis=1)), axis=-1)
+    return poses, odometries
+
+
+def simulate_endpoints(num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+                       circular=False, sigma_o_right=None, sigma_o_left=None, scenario=NO_CORRECTION,
+                       rng=None, b=AXIS_LENGTH, radius=RADIUS):
+    # Final (x, y) of the true pose and of the odometry, shape (num_runs, 2) each
+    delta_x, delta_y, _, odo_delta_x, odo_delta_y = step_increments(
+        num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+        circular, sigma_o_right, sigma_o_left, scenario, rng, b, radius)
+    positions = np.stack((delta_x.sum(axis=1), delta_y.sum(axis=1)), axis=-1)
+    if odo_delta_x is delta_x:
+        return positions, positions.copy()
+    return positions, np.stack((odo_delta_x.sum(axis=1), odo_delta_y.sum(axis=1)), axis=-1)
+
+
+def default_chunk_size(time_step, total_time):
+    return max(1, CHUNK_ELEMENTS // max(1, num_steps(time_step, total_time)))
+
+
+def iter_chunks(num_runs, chunk_size):
+    # Yields the run counts of consecutive chunks
+    for start in range(0, num_runs, chunk_size):
+        yield min(chunk_size, num_runs - start)
+
+
+def simulate_robot(num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+                   circular=False, sigma_o_right=None, sigma_o_left=None, scenario=NO_CORRECTION,
+                   rng=None, b=AXIS_LENGTH, radius=RADIUS, chunk_size=None):
+    """Vectorized replacement for the ex07 `simulate_robot` loops.
+
+    Runs are simulated `chunk_size` at a time, so memory stays bounded for 10^6 runs.
+    Returns `(positions, odometries)`, both `(num_runs, 2)`.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    chunk_size = chunk_size or default_chunk_size(time_step, total_time)
+    positions = np.zeros((num_runs, 2))  # x, y positions
+    odometries = np.zeros((num_runs, 2))  # x, y odometry
+    start = 0
+    for n in iter_chunks(num_runs, chunk_size):
+        positions[start:start + n], odometries[start:start + n] = simulate_endpoints(
+            n, velocity, time_step, total_time, sigma_right, sigma_left,
+            circular, sigma_o_right, sigma_o_left, scenario, rng, b, radius)
+        start += n
+    return positions, odometries
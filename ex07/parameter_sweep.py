@@ -0,0 +1,100 @@
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+import odometry_engine
+import pose_histogram
+from parallel_runner import map_shards
+
+# Used for every axis the grid leaves out: the wheel noise and 10 s run of task c, but
+# straight-line driving without odometry noise (task c itself is circular, sigma_o_* = 0.2)
+DEFAULT_PARAMS = dict(velocity=1.0, time_step=0.1, total_time=10.0,
+                      sigma_right=0.1, sigma_left=0.1, sigma_o_right=None, sigma_o_left=None,
+                      circular=False, scenario=odometry_engine.NO_CORRECTION)
+CACHE_DIR = 'ex07/sweep_cache'
+
+
+def expand_grid(grid):
+    # Cartesian product of the grid axes, one full parameter dict per cell
+    axes = sorted(grid)
+    unknown = set(axes) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}")
+    cells = []
+    for values in itertools.product(*(grid[axis] for axis in axes)):
+        params = dict(DEFAULT_PARAMS)
+        params.update(zip(axes, values))
+        cells.append(params)
+    return cells
+
+
+def cell_key(params, num_runs, seed):
+    # Stable hash of everything that determines a cell's result
+    payload = json.dumps({'params': params, 'num_runs': num_runs, 'seed': seed}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def run_cell(job):
+    """Simulate one sweep cell and return its summary statistics.
+
+    The cell's random stream is seeded from its key, so a cell's result does not
+    depend on which other cells are in the grid.
+    """
+    params, num_runs, seed, key = job
+    rng = np.random.default_rng(np.random.SeedSequence(int(key, 16)))
+    positions, odometries = pose_histogram.accumulate_endpoints(num_runs, rng=rng, **params)
+    summary = {'key': key, 'params': params, 'num_runs': num_runs, 'seed': seed}
+    for name, histogram in (('positions', positions), ('odometries', odometries)):
+        summary[name] = {'mean': histogram.mean.tolist(),
+                         'covariance': histogram.covariance.tolist(),
+                         'x_edges': histogram.x_edges.tolist(),
+                         'y_edges': histogram.y_edges.tolist(),
+                         'counts': histogram.counts.tolist()}
+    return summary
+
+
+def load_cached(cache_dir, key):
+    path = os.path.join(cache_dir, f'{key}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def store_cached(cache_dir, summary):
+    # Write through a temporary file so an interrupted sweep never leaves a partial cell
+    path = os.path.join(cache_dir, f"{summary['key']}.json")
+    with open(path + '.tmp', 'w') as f:
+        json.dump(summary, f)
+    os.replace(path + '.tmp', path)
+
+
+def run_sweep(grid, num_runs=10_000, seed=0, cache_dir=CACHE_DIR, workers=None):
+    """Run every cell of `grid` in parallel, reusing cached cells from earlier sweeps.
+
+    `grid` maps parameter names (see DEFAULT_PARAMS) to lists of values. Returns the
+    summaries in grid order; only cells missing from `cache_dir` are simulated.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    cells = expand_grid(grid)
+    keys = [cell_key(params, num_runs, seed) for params in cells]
+    summaries = [load_cached(cache_dir, key) for key in keys]
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    print(f"Sweep: {len(cells)} cells, {len(cells) - len(missing)} cached, {len(missing)} to compute")
+
+    jobs = [(cells[i], num_runs, seed, keys[i]) for i in missing]
+    for i, summary in zip(missing, map_shards(run_cell, jobs, workers)):
+        store_cached(cache_dir, summary)
+        summaries[i] = summary
+    return summaries
+
+
+if __name__ == "__main__":
+    grid = dict(velocity=[0.5, 1.0], sigma_right=[0.05, 0.1, 0.2], sigma_left=[0.05, 0.1, 0.2],
+                circular=[False, True])
+    for summary in run_sweep(grid):
+        params = summary['params']
+        spread = np.sqrt(np.diag(summary['positions']['covariance']))
+        print(f"v={params['velocity']} sigma_r={params['sigma_right']} sigma_l={params['sigma_left']} "
+              f"circular={params['circular']}: mean {np.round(summary['positions']['mean'], 3)} std {np.round(spread, 3)}")
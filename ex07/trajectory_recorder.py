@@ -0,0 +1,67 @@
+import numpy as np
+import odometry_engine
+
+
+def record_trajectories(path, num_runs, velocity, time_step, total_time, sigma_right, sigma_left,
+                        circular=False, sigma_o_right=None, sigma_o_left=None,
+                        scenario=odometry_engine.NO_CORRECTION, dtype=np.float32,
+                        odometry_path=None, rng=None, chunk_size=None):
+    """Simulate and write every intermediate pose to a `.npy` file on disk.
+
+    The `(num_runs, steps, 3)` x/y/theta tensor is filled chunk by chunk through a
+    memory map, so only one chunk is ever held in RAM. With `odometry_path` the
+    `(num_runs, steps, 2)` odometry tensor is stored the same way.
+    Returns the trajectories reopened read-only.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    chunk_size = chunk_size or odometry_engine.default_chunk_size(time_step, total_time)
+    steps = odometry_engine.num_steps(time_step, total_time)
+    trajectories = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(num_runs, steps, 3))
+    odometries = None
+    if odometry_path is not None:
+        odometries = np.lib.format.open_memmap(odometry_path, mode='w+', dtype=dtype, shape=(num_runs, steps, 2))
+
+    start = 0
+    for n in odometry_engine.iter_chunks(num_runs, chunk_size):
+        poses, odometry = odometry_engine.simulate_poses(
+            n, velocity, time_step, total_time, sigma_right, sigma_left,
+            circular, sigma_o_right, sigma_o_left, scenario, rng)
+        trajectories[start:start + n] = poses
+        if odometries is not None:
+            odometries[start:start + n] = odometry
+        start += n
+
+    trajectories.flush()
+    del trajectories
+    if odometries is not None:
+        odometries.flush()
+        del odometries
+    return load_trajectories(path)
+
+
+def load_trajectories(path):
+    # Reopen a recorded study without re-simulating; data is paged in on access
+    return np.load(path, mmap_mode='r')
+
+
+def drift_over_time(trajectories, chunk_size=10_000):
+    """Per-step mean and standard deviation of x, y and theta across all runs.
+
+    Reads the (possibly memory-mapped) tensor in run chunks and accumulates in
+    float64, so it works on recordings larger than RAM. Returns `(mean, std)`,
+    both `(steps, 3)`.
+    """
+    num_runs, steps, dims = trajectories.shape
+    count = 0
+    mean = np.zeros((steps, dims))
+    m2 = np.zeros((steps, dims))
+    for start in range(0, num_runs, chunk_size):
+        chunk = np.asarray(trajectories[start:start + chunk_size], dtype=np.float64)
+        n = len(chunk)
+        chunk_mean = chunk.mean(axis=0)
+        delta = chunk_mean - mean
+        # Chan et al. merge of the chunk moments, stable for small spreads around large means
+        m2 += ((chunk - chunk_mean) ** 2).sum(axis=0) + delta ** 2 * (count * n / (count + n))
+        mean += delta * (n / (count + n))
+        count += n
+    return mean, np.sqrt(m2 / max(count, 1))
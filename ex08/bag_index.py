@@ -0,0 +1,152 @@
+import glob
+import os
+import sqlite3
+from contextlib import closing
+import numpy as np
+from ex08_world_model import typestore
+from cdr_laserscan import decode_laserscan
+
+INDEX_NAME = 'bag_index.npz'
+
+
+def bag_files(bag_path):
+    # The sqlite3 storage files of a rosbag2 directory, in split order
+    files = sorted(glob.glob(os.path.join(bag_path, '*.db3')))
+    if not files:
+        raise ValueError(f"{bag_path} has no .db3 files (only sqlite3 bags can be indexed)")
+    return files
+
+
+def build_index(bag_path):
+    """Read timestamp and row id of every message, without touching the payloads.
+
+    Returns a dict of arrays: for every topic `<topic>:timestamps` (int64 ns, sorted),
+    `<topic>:files` (index into `files`) and `<topic>:rows` (sqlite row id), plus the
+    bag's `files`, their sizes and modification times, and the `topics`/`types` names.
+    """
+    files = bag_files(bag_path)
+    per_topic = {}
+    types = {}
+    for file_number, path in enumerate(files):
+        with closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as db:
+            names = {topic_id: (name, msgtype) for topic_id, name, msgtype in db.execute('SELECT id, name, type FROM topics')}
+            rows = np.array(db.execute('SELECT topic_id, timestamp, id FROM messages').fetchall(), dtype=np.int64).reshape(-1, 3)
+        for topic_id, (name, msgtype) in names.items():
+            selected = rows[rows[:, 0] == topic_id]
+            types[name] = msgtype
+            per_topic.setdefault(name, []).append(np.column_stack((selected[:, 1], np.full(len(selected), file_number), selected[:, 2])))
+
+    index = {'files': np.array([os.path.basename(path) for path in files]),
+             'sizes': np.array([os.path.getsize(path) for path in files], dtype=np.int64),
+             'mtimes': np.array([os.path.getmtime(path) for path in files]),
+             'topics': np.array(list(per_topic)), 'types': np.array([types[name] for name in per_topic])}
+    for name, parts in per_topic.items():
+        entries = np.concatenate(parts)
+        entries = entries[np.argsort(entries[:, 0], kind='stable')]
+        index[f'{name}:timestamps'] = entries[:, 0]
+        index[f'{name}:files'] = entries[:, 1]
+        index[f'{name}:rows'] = entries[:, 2]
+    return index
+
+
+def is_current(index, bag_path):
+    # The sidecar is stale once the bag's files were replaced or rewritten
+    files = bag_files(bag_path)
+    return (list(index['files']) == [os.path.basename(path) for path in files]
+            and list(index['sizes']) == [os.path.getsize(path) for path in files]
+            and np.allclose(index['mtimes'], [os.path.getmtime(path) for path in files]))
+
+
+def load_or_build_index(bag_path, index_path=None):
+    # Build the sidecar index the first time a bag is opened, afterwards just load it
+    index_path = index_path or os.path.join(bag_path, INDEX_NAME)
+    if os.path.exists(index_path):
+        with np.load(index_path) as data:
+            index = {name: data[name] for name in data.files}
+        if is_current(index, bag_path):
+            return index
+    index = build_index(bag_path)
+    np.savez(index_path, **index)
+    return index
+
+
+class BagIndex:
+    """Random access into a rosbag2 sqlite3 recording through its sidecar index.
+
+    Messages are selected by time window (seconds from the start of the recording)
+    and stride on the index alone; only the selected payloads are read, by row id.
+    """
+
+    def __init__(self, bag_path, index_path=None):
+        self.bag_path = bag_path
+        self.index = load_or_build_index(bag_path, index_path)
+        self.files = [os.path.join(bag_path, name) for name in self.index['files']]
+        self.types = dict(zip(self.index['topics'], self.index['types']))
+        starts = [self.index[f'{name}:timestamps'][0] for name in self.types if len(self.index[f'{name}:timestamps'])]
+        self.start_time = int(min(starts)) if starts else 0
+        self._connections = {}
+
+    def timestamps(self, topic='/scan'):
+        return self.index[f'{topic}:timestamps']
+
+    def __len__(self):
+        return sum(len(self.timestamps(name)) for name in self.types)
+
+    def select(self, topic='/scan', start=None, end=None, stride=1):
+        # Positions of every stride-th message with start <= t < end (seconds from the bag start)
+        timestamps = self.timestamps(topic)
+        first = 0 if start is None else np.searchsorted(timestamps, self.start_time + int(start * 1e9), 'left')
+        last = len(timestamps) if end is None else np.searchsorted(timestamps, self.start_time + int(end * 1e9), 'left')
+        return np.arange(first, last, stride)
+
+    def _connection(self, file_number):
+        if file_number not in self._connections:
+            self._connections[file_number] = sqlite3.connect(f'file:{self.files[file_number]}?mode=ro', uri=True)
+        return self._connections[file_number]
+
+    def raw_messages(self, topic='/scan', positions=None, batch_size=500):
+        """Yield `(timestamp, rawdata)` for the given index positions of `topic`, in position order."""
+        timestamps = self.timestamps(topic)
+        positions = np.arange(len(timestamps)) if positions is None else np.asarray(positions)
+        files = self.index[f'{topic}:files']
+        rows = self.index[f'{topic}:rows']
+        for first in range(0, len(positions), batch_size):
+            batch = positions[first:first + batch_size]
+            payloads = {}
+            for file_number in np.unique(files[batch]):
+                wanted = rows[batch][files[batch] == file_number].tolist()
+                query = f"SELECT id, data FROM messages WHERE id IN ({','.join('?' * len(wanted))})"
+                for row, data in self._connection(int(file_number)).execute(query, wanted):
+                    payloads[(int(file_number), row)] = data
+            for position in batch:
+                yield int(timestamps[position]), payloads[(int(files[position]), int(rows[position]))]
+
+    def scans(self, start=None, end=None, stride=1, topic='/scan'):
+        """Decoded LaserScans (see cdr_laserscan.Scan) of every `stride`-th scan in [start, end) seconds."""
+        msgtype = self.types[topic]
+        for timestamp, rawdata in self.raw_messages(topic, self.select(topic, start, end, stride)):
+            yield timestamp, decode_laserscan(rawdata, msgtype, typestore)
+
+    def close(self):
+        for connection in self._connections.values():
+            connection.close()
+        self._connections = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    with BagIndex('ex08') as bag:
+        opened = time.perf_counter() - start
+        #every 10th scan between t=5 s and t=20 s
+        scans = list(bag.scans(start=5.0, end=20.0, stride=10))
+    seconds = time.perf_counter() - start
+    print(f"Index of {len(bag)} messages ready in {opened:.3f} s")
+    print(f"Fetched {len(scans)} scans in {seconds - opened:.3f} s")
@@ -0,0 +1,151 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+from ex08_world_model import (extract_lidar_data, polar_to_cartesian, point_distance_to_line, points_distance_to_line,
+                              range_sigmas, split_and_merge_algorithm)
+from synthetic_scans import polygon_walls, raycast
+
+SIZES = (360, 640, 2048, 10000)
+DISTRIBUTIONS = ('straight_walls', 'noisy_corridor', 'zigzag')
+METRICS = ('p50_us', 'p90_us', 'p99_us', 'mean_us', 'peak_bytes', 'allocations')
+
+
+def workload(distribution, n_beams, seed=0):
+    """Ranges of one full-circle scan; returns `(ranges, angle_min, angle_increment)`.
+
+    straight_walls: a 4 m x 3 m room with 5 mm noise; noisy_corridor: a long 2 m wide
+    corridor with range-dependent noise of 3 cm + 2 cm/m; zigzag: every beam alternates
+    between 1.5 m and 2.5 m, so every point is a corner (worst case for the split).
+    """
+    rng = np.random.default_rng(seed)
+    angle_min, angle_increment = -np.pi, 2 * np.pi / (n_beams - 1)
+    angles = angle_min + np.arange(n_beams) * angle_increment
+    if distribution == 'zigzag':
+        return 2.0 + 0.5 * (-1.0) ** np.arange(n_beams), angle_min, angle_increment
+    if distribution == 'straight_walls':
+        walls, sigma_0, sigma_per_meter = polygon_walls([(-1.5, -1.0), (2.5, -1.0), (2.5, 2.0), (-1.5, 2.0)]), 0.005, 0.0
+    elif distribution == 'noisy_corridor':
+        walls, sigma_0, sigma_per_meter = polygon_walls([(-20, -1), (20, -1), (20, 1), (-20, 1)]), 0.03, 0.02
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    ranges = raycast(walls, (0.0, 0.0, 0.0), np.cos(angles), np.sin(angles), np.inf)
+    return ranges + rng.normal(size=n_beams) * (sigma_0 + sigma_per_meter * ranges), angle_min, angle_increment
+
+
+def measure(function, repeats=50, warmup=3):
+    """Per-call latency percentiles (microseconds) plus peak memory and allocations of one traced call.
+
+    `allocations` counts the memory blocks still allocated after the call returned
+    (including its result), as tracemalloc only sees live blocks.
+    """
+    for _ in range(warmup):
+        function()
+    times = np.empty(repeats)
+    for k in range(repeats):
+        start = time.perf_counter_ns()
+        function()
+        times[k] = time.perf_counter_ns() - start
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    allocations = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, 'lineno'))
+    p50, p90, p99 = np.percentile(times, [50, 90, 99]) / 1e3
+    return {'p50_us': p50, 'p90_us': p90, 'p99_us': p99, 'mean_us': times.mean() / 1e3,
+            'peak_bytes': int(peak), 'allocations': int(allocations), 'repeats': repeats}
+
+
+def scan_cases(distribution, n_beams):
+    # (name, callable) of every hot path on one workload scan
+    ranges, angle_min, angle_increment = workload(distribution, n_beams)
+    points = polar_to_cartesian(ranges, angle_min, angle_increment)
+    sigmas = range_sigmas(points)
+    start, end = points[0], points[len(points) // 2]
+    return [
+        ('polar_to_cartesian', lambda: polar_to_cartesian(ranges, angle_min, angle_increment)),
+        # The scalar distance, called once per point as the original split loop did
+        ('point_distance_to_line', lambda: [point_distance_to_line(point, start, end) for point in points]),
+        ('points_distance_to_line', lambda: points_distance_to_line(points, start, end)),
+        ('split_and_merge', lambda: split_and_merge_algorithm(points, 0.05, np.radians(5), 0.1)),
+        ('split_and_merge_adaptive', lambda: split_and_merge_algorithm(points, 3.0, np.radians(5), 0.1,
+                                                                       sigmas=sigmas, max_gap=0.3)),
+    ]
+
+
+def run_benchmarks(sizes=SIZES, distributions=DISTRIBUTIONS, repeats=50, bag_path='ex08'):
+    """Run every case and return the results document (metadata plus one entry per case)."""
+    results = {}
+    for distribution in distributions:
+        for n_beams in sizes:
+            for name, function in scan_cases(distribution, n_beams):
+                # Keep the slow scalar loop on big scans from dominating the run time
+                count = repeats if n_beams <= 2048 or name == 'polar_to_cartesian' else max(repeats // 5, 5)
+                results[f'{name}/{distribution}/{n_beams}'] = measure(function, count)
+    if glob.glob(os.path.join(bag_path, '*.db3')):
+        results['extract_lidar_data/bag/first_scan'] = measure(lambda: extract_lidar_data(bag_path), max(repeats // 5, 5))
+    return {'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                     'numpy': np.__version__, 'machine': platform.machine(), 'processor': platform.processor()},
+            'results': results}
+
+
+def save_results(path, document):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold=0.2, metrics=('p50_us', 'peak_bytes')):
+    """Relative change of `metrics` for every case both runs have.
+
+    Returns `(rows, regressions)`: rows are `(case, metric, old, new, change)`, and
+    regressions the rows whose value grew by more than `threshold` (0.2 = 20 %).
+    """
+    rows = []
+    for case in sorted(set(baseline['results']) & set(current['results'])):
+        for metric in metrics:
+            old, new = baseline['results'][case][metric], current['results'][case][metric]
+            change = (new - old) / old if old else 0.0
+            rows.append((case, metric, old, new, change))
+    return rows, [row for row in rows if row[4] > threshold]
+
+
+def print_results(document):
+    print(f"{'case':<52}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}{'peak KiB':>11}{'allocs':>8}")
+    for case, stats in document['results'].items():
+        print(f"{case:<52}{stats['p50_us']:>12.1f}{stats['p90_us']:>12.1f}{stats['p99_us']:>12.1f}"
+              f"{stats['peak_bytes'] / 1024:>11.1f}{stats['allocations']:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the ex08 lidar processing hot paths')
+    parser.add_argument('--output', default='ex08/benchmark_results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier results to diff against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown counted as a regression')
+    parser.add_argument('--repeats', type=int, default=50)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    args = parser.parse_args()
+
+    document = run_benchmarks(args.sizes, repeats=args.repeats)
+    save_results(args.output, document)
+    print_results(document)
+    print(f"Results written to {args.output}")
+    if args.baseline:
+        rows, regressions = compare(load_results(args.baseline), document, args.threshold)
+        for case, metric, old, new, change in regressions:
+            print(f"REGRESSION {case} {metric}: {old:.1f} -> {new:.1f} ({100 * change:+.0f} %)")
+        print(f"{len(regressions)} of {len(rows)} compared metrics regressed by more than {100 * args.threshold:.0f} %")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,72 @@
+import struct
+from collections import namedtuple
+import numpy as np
+
+# Fields of sensor_msgs/msg/LaserScan that the ex08 pipeline uses
+Scan = namedtuple('Scan', ['stamp', 'angle_min', 'angle_max', 'angle_increment',
+                           'range_min', 'range_max', 'ranges'])
+
+LASERSCAN_TYPE = 'sensor_msgs/msg/LaserScan'
+CDR_LITTLE_ENDIAN = b'\x00\x01'
+_HEADER = struct.Struct('<iiI')  # stamp.sec, stamp.nanosec, len(frame_id)
+_SCAN_FIELDS = struct.Struct('<7fI')  # angle_min .. range_max, len(ranges)
+_COUNT = struct.Struct('<I')
+
+
+def _align(offset, size):
+    # CDR aligns primitives to their size, counted after the 4-byte encapsulation header
+    return 4 + (offset - 4 + size - 1) // size * size
+
+
+def decode_laserscan_fast(rawdata):
+    """Decode a little-endian CDR LaserScan without the generic deserializer.
+
+    `ranges` is a float32 `np.frombuffer` view over `rawdata`, no copy is made.
+    Returns None if the payload does not have the expected layout.
+    """
+    if len(rawdata) < 4 + _HEADER.size or rawdata[:2] != CDR_LITTLE_ENDIAN:
+        return None
+    sec, nanosec, frame_id_length = _HEADER.unpack_from(rawdata, 4)
+    offset = _align(4 + _HEADER.size + frame_id_length, 4)
+    if offset + _SCAN_FIELDS.size > len(rawdata):
+        return None
+    angle_min, angle_max, angle_increment, _, _, range_min, range_max, n_ranges = \
+        _SCAN_FIELDS.unpack_from(rawdata, offset)
+    offset += _SCAN_FIELDS.size
+    ranges_end = offset + 4 * n_ranges
+    if ranges_end + _COUNT.size > len(rawdata):
+        return None
+    # The intensities sequence must end exactly at the payload end (plus CDR padding)
+    n_intensities, = _COUNT.unpack_from(rawdata, ranges_end)
+    if not 0 <= len(rawdata) - (ranges_end + _COUNT.size + 4 * n_intensities) < 4:
+        return None
+    ranges = np.frombuffer(rawdata, dtype='<f4', count=n_ranges, offset=offset)
+    return Scan(sec * 1_000_000_000 + nanosec, angle_min, angle_max, angle_increment,
+                range_min, range_max, ranges)
+
+
+def decode_laserscan(rawdata, msgtype, typestore):
+    # Fast path for LaserScan, generic rosbags deserializer for anything else
+    if msgtype == LASERSCAN_TYPE:
+        scan = decode_laserscan_fast(rawdata)
+        if scan is not None:
+            return scan
+    msg = typestore.deserialize_cdr(rawdata, msgtype)
+    return Scan(msg.header.stamp.sec * 1_000_000_000 + msg.header.stamp.nanosec,
+                msg.angle_min, msg.angle_max, msg.angle_increment,
+                msg.range_min, msg.range_max, msg.ranges)
+
+
+def encode_laserscan(scan, frame_id='laser', time_increment=0.0, scan_time=0.0, intensities=None):
+    """Serialize a Scan as a little-endian CDR sensor_msgs/msg/LaserScan (inverse of the fast path)."""
+    ranges = np.asarray(scan.ranges, dtype='<f4')
+    intensities = np.zeros(0, dtype='<f4') if intensities is None else np.asarray(intensities, dtype='<f4')
+    name = frame_id.encode() + b'\x00'
+    sec, nanosec = divmod(int(scan.stamp), 1_000_000_000)
+    parts = [CDR_LITTLE_ENDIAN, b'\x00\x00', _HEADER.pack(sec, nanosec, len(name)), name]
+    size = 4 + _HEADER.size + len(name)
+    parts.append(b'\x00' * (_align(size, 4) - size))
+    parts.append(_SCAN_FIELDS.pack(scan.angle_min, scan.angle_max, scan.angle_increment, time_increment,
+                                   scan_time, scan.range_min, scan.range_max, len(ranges)))
+    parts += [ranges.tobytes(), _COUNT.pack(len(intensities)), intensities.tobytes()]
+    return b''.join(parts)
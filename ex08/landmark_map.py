@@ -0,0 +1,169 @@
+import numpy as np
+
+# 95% gate of a chi-square distribution with 2 degrees of freedom (rho, alpha)
+CHI2_GATE_2DOF = 5.991
+
+
+def wrap_angle(angle):
+    return (angle + np.pi) % (2 * np.pi) - np.pi
+
+
+def transform_lines(lines, covariances, endpoints, pose):
+    """Move (rho, alpha) lines, their covariances and endpoints from the sensor frame into the map frame."""
+    x, y, theta = pose
+    alpha = wrap_angle(lines[:, 1] + theta)
+    rho = lines[:, 0] + x * np.cos(alpha) + y * np.sin(alpha)
+    jacobian = np.zeros((len(lines), 2, 2))
+    jacobian[:, 0, 0] = jacobian[:, 1, 1] = 1.0
+    jacobian[:, 0, 1] = -x * np.sin(alpha) + y * np.cos(alpha)
+    covariances = jacobian @ covariances @ jacobian.transpose(0, 2, 1)
+    # Keep rho >= 0 by flipping the normal
+    flip = rho < 0
+    rho[flip], alpha[flip] = -rho[flip], wrap_angle(alpha[flip] + np.pi)
+    covariances[flip, 0, 1] *= -1
+    covariances[flip, 1, 0] *= -1
+    c, s = np.cos(theta), np.sin(theta)
+    endpoints = endpoints @ np.array([[c, s], [-s, c]]) + np.array([x, y])
+    return np.column_stack((rho, alpha)), covariances, endpoints
+
+
+class LineLandmarkMap:
+    """Persistent line-feature landmarks with a uniform-grid spatial index.
+
+    Every landmark keeps rho/alpha, their covariance, its segment endpoints and an
+    observation count. The grid maps each cell to the landmarks whose (padded)
+    segment bounding box overlaps it, so associating a new segment only looks at
+    landmarks near it, independent of the map size.
+    """
+
+    def __init__(self, cell_size=1.0, search_margin=0.3, gate=CHI2_GATE_2DOF,
+                 noise_floor=(0.01, np.radians(1.0)), capacity=256):
+        self.cell_size = cell_size
+        # Minimum rho/alpha standard deviations added to every observation; fits of
+        # very short segments report a zero covariance otherwise
+        self.noise_floor = np.diag(np.square(noise_floor))
+        self.search_margin = search_margin
+        self.gate = gate
+        self.count = 0
+        self.lines = np.zeros((capacity, 2))
+        self.covariances = np.zeros((capacity, 2, 2))
+        self.endpoints = np.zeros((capacity, 2, 2))
+        self.observations = np.zeros(capacity, dtype=np.int64)
+        self.grid = {}
+        self.cells_of = []
+
+    def _grow(self):
+        capacity = 2 * len(self.lines)
+        for name in ('lines', 'covariances', 'endpoints', 'observations'):
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def _cells(self, endpoints):
+        low = np.floor((endpoints.min(axis=0) - self.search_margin) / self.cell_size).astype(int)
+        high = np.floor((endpoints.max(axis=0) + self.search_margin) / self.cell_size).astype(int)
+        return [(i, j) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1)]
+
+    def _index(self, landmark):
+        for cell in self.cells_of[landmark]:
+            self.grid[cell].discard(landmark)
+        self.cells_of[landmark] = self._cells(self.endpoints[landmark])
+        for cell in self.cells_of[landmark]:
+            self.grid.setdefault(cell, set()).add(landmark)
+
+    def add(self, line, covariance, endpoints):
+        if self.count == len(self.lines):
+            self._grow()
+        landmark = self.count
+        self.lines[landmark] = line
+        self.covariances[landmark] = covariance
+        self.endpoints[landmark] = endpoints
+        self.observations[landmark] = 1
+        self.cells_of.append([])
+        self.count += 1
+        self._index(landmark)
+        return landmark
+
+    def candidates(self, endpoints):
+        found = set()
+        for cell in self._cells(endpoints):
+            found |= self.grid.get(cell, set())
+        return np.fromiter(found, dtype=np.int64, count=len(found))
+
+    def associate(self, line, covariance, endpoints):
+        # Nearest landmark by Mahalanobis distance inside the gate, or (None, inf)
+        candidates = self.candidates(endpoints)
+        if len(candidates) == 0:
+            return None, np.inf
+        innovation = self._innovation(line, candidates)
+        innovation_covariance = self.covariances[candidates] + covariance
+        distances = np.einsum('ni,ni->n', innovation, np.linalg.solve(innovation_covariance, innovation[:, :, None])[..., 0])
+        best = int(np.argmin(distances))
+        if distances[best] > self.gate:
+            return None, distances[best]
+        return int(candidates[best]), distances[best]
+
+    def _innovation(self, line, landmarks):
+        # Observation minus landmark in (rho, alpha); near-origin lines may have the opposite normal
+        stored = self.lines[landmarks]
+        innovation = np.column_stack((line[0] - stored[:, 0], wrap_angle(line[1] - stored[:, 1])))
+        flipped = np.abs(innovation[:, 1]) > np.pi / 2
+        innovation[flipped, 0] = -line[0] - stored[flipped, 0]
+        innovation[flipped, 1] = wrap_angle(line[1] + np.pi - stored[flipped, 1])
+        return innovation
+
+    def update(self, landmark, line, covariance, endpoints):
+        # Kalman fusion of the observation into the landmark, in place
+        innovation = self._innovation(line, np.array([landmark]))[0]
+        prior = self.covariances[landmark]
+        gain = prior @ np.linalg.inv(prior + covariance)
+        rho, alpha = self.lines[landmark] + gain @ innovation
+        if rho < 0:
+            rho, alpha = -rho, alpha + np.pi
+        self.lines[landmark] = rho, wrap_angle(alpha)
+        self.covariances[landmark] = (np.eye(2) - gain) @ prior
+        self.observations[landmark] += 1
+
+        # The landmark's extent is the span of old and new endpoints along the updated line
+        normal = np.array([np.cos(self.lines[landmark, 1]), np.sin(self.lines[landmark, 1])])
+        direction = np.array([-normal[1], normal[0]])
+        along = np.concatenate((self.endpoints[landmark], endpoints)) @ direction
+        foot = self.lines[landmark, 0] * normal
+        self.endpoints[landmark] = foot + np.outer([along.min(), along.max()], direction)
+        self._index(landmark)
+
+    def integrate(self, lines, covariances, endpoints, pose=(0.0, 0.0, 0.0)):
+        """Associate one scan's segments (sensor frame) and update or add landmarks.
+
+        Returns the landmark id of every segment.
+        """
+        lines, covariances, endpoints = transform_lines(np.asarray(lines, dtype=float).reshape(-1, 2),
+                                                        np.asarray(covariances, dtype=float).reshape(-1, 2, 2),
+                                                        np.asarray(endpoints, dtype=float).reshape(-1, 2, 2), pose)
+        covariances = covariances + self.noise_floor
+        ids = np.empty(len(lines), dtype=np.int64)
+        for k in range(len(lines)):
+            landmark, _ = self.associate(lines[k], covariances[k], endpoints[k])
+            if landmark is None:
+                ids[k] = self.add(lines[k], covariances[k], endpoints[k])
+            else:
+                self.update(landmark, lines[k], covariances[k], endpoints[k])
+                ids[k] = landmark
+        return ids
+
+
+if __name__ == "__main__":
+    import time
+    from scan_pipeline import extract_line_maps
+
+    landmarks = LineLandmarkMap()
+    start = time.perf_counter()
+    n_scans = n_segments = 0
+    for scan_lines in extract_line_maps('ex08', workers=1):
+        landmarks.integrate(scan_lines.lines, scan_lines.covariances, scan_lines.endpoints)
+        n_scans += 1
+        n_segments += len(scan_lines.lines)
+    seconds = time.perf_counter() - start
+    print(f"{n_segments} segments from {n_scans} scans -> {landmarks.count} landmarks in {seconds:.2f} s")
+    print(f"Landmarks observed in more than 100 scans: {(landmarks.observations[:landmarks.count] > 100).sum()}")
@@ -0,0 +1,143 @@
+import numpy as np
+from ex08_world_model import beam_trig_table
+
+
+def probability(log_odds):
+    return 1.0 - 1.0 / (1.0 + np.exp(log_odds))
+
+
+def traverse_rays(origin, ends):
+    """Vectorized DDA: every grid cell crossed by each ray, all rays at once.
+
+    `origin` (2,) and `ends` (n, 2) are in cell units. A ray enters a new cell at
+    every integer x and every integer y between its ends; the cell entered at such a
+    border follows from the crossing parameter along the ray. The visiting order is
+    not needed for an occupancy update, so no per-ray sorting is done.
+    Returns `(crossed_cells, hit_cells)` as integer (m, 2) and (n, 2) arrays;
+    `crossed_cells` includes the start cell and the rays' end cells.
+    """
+    ends = np.asarray(ends, dtype=float)
+    hit_cells = np.floor(ends).astype(np.int64)
+    start_cell = np.floor(origin).astype(np.int64)
+    cells = [start_cell[None, :]]
+    direction = ends - origin
+    for axis, other in ((0, 1), (1, 0)):
+        sign = np.sign(direction[:, axis]).astype(np.int64)
+        count = np.abs(hit_cells[:, axis] - start_cell[axis])
+        rays, k = np.nonzero(np.arange(count.max(initial=0))[None, :] < count[:, None])
+        # Border crossed at the k-th step and the parameter t in (0, 1] where that happens
+        entered = start_cell[axis] + sign[rays] * (k + 1)
+        border = entered + (sign[rays] < 0)
+        t = (border - origin[axis]) / direction[rays, axis]
+        crossed = np.empty((len(rays), 2), dtype=np.int64)
+        crossed[:, axis] = entered
+        crossed[:, other] = np.floor(origin[other] + t * direction[rays, other])
+        cells.append(crossed)
+    return np.concatenate(cells), hit_cells
+
+
+class OccupancyGrid:
+    """Log-odds occupancy grid stored as a dict of square tiles.
+
+    Tiles are created on first touch, so the map grows in any direction without
+    reallocating what is already mapped.
+    """
+
+    def __init__(self, resolution=0.05, tile_size=64, log_odds_hit=0.85, log_odds_free=-0.4,
+                 log_odds_min=-5.0, log_odds_max=5.0):
+        self.resolution = resolution
+        self.tile_size = tile_size
+        self.log_odds_hit = log_odds_hit
+        self.log_odds_free = log_odds_free
+        self.log_odds_min = log_odds_min
+        self.log_odds_max = log_odds_max
+        self.tiles = {}
+
+    def add_window(self, window, low):
+        # Add a dense log-odds window whose cell [0, 0] is map cell `low`, tile by tile.
+        # Tiles the window leaves untouched (all zero) are not created.
+        high = low + np.array(window.shape) - 1
+        size = self.tile_size
+        for tx in range(low[0] // size, high[0] // size + 1):
+            x0, x1 = max(low[0], tx * size), min(high[0], tx * size + size - 1) + 1
+            for ty in range(low[1] // size, high[1] // size + 1):
+                y0, y1 = max(low[1], ty * size), min(high[1], ty * size + size - 1) + 1
+                part = window[x0 - low[0]:x1 - low[0], y0 - low[1]:y1 - low[1]]
+                if not part.any():
+                    continue
+                tile = self.tiles.get((tx, ty))
+                if tile is None:
+                    tile = self.tiles[(tx, ty)] = np.zeros((size, size), dtype=np.float32)
+                target = tile[x0 - tx * size:x1 - tx * size, y0 - ty * size:y1 - ty * size]
+                target += part
+                np.clip(target, self.log_odds_min, self.log_odds_max, out=target)
+
+    def integrate_scan(self, ranges, angle_min, angle_increment, pose=(0.0, 0.0, 0.0),
+                       range_min=None, range_max=None):
+        """Fuse one LaserScan taken at `pose` (x, y, theta in the map frame)."""
+        ranges = np.asarray(ranges, dtype=float)
+        cos_table, sin_table = beam_trig_table(angle_min, angle_increment, len(ranges))
+        valid = np.isfinite(ranges)
+        if range_min is not None:
+            valid &= ranges >= range_min
+        if range_max is not None:
+            valid &= ranges <= range_max
+        r = ranges[valid]
+        x, y, theta = pose
+        cos_theta, sin_theta = np.cos(theta), np.sin(theta)
+        local_x, local_y = r * cos_table[valid], r * sin_table[valid]
+        ends = np.column_stack((x + cos_theta * local_x - sin_theta * local_y,
+                                y + sin_theta * local_x + cos_theta * local_y))
+        free_cells, hit_cells = traverse_rays(np.array([x, y]) / self.resolution, ends / self.resolution)
+
+        # Scan-local update window: every crossed cell is cleared once, then hit cells
+        # (of this beam or any other) are overwritten as occupied
+        low = free_cells.min(axis=0)
+        window = np.zeros(free_cells.max(axis=0) - low + 1, dtype=np.float32)
+        window[free_cells[:, 0] - low[0], free_cells[:, 1] - low[1]] = self.log_odds_free
+        window[hit_cells[:, 0] - low[0], hit_cells[:, 1] - low[1]] = self.log_odds_hit
+        self.add_window(window, low)
+
+    def integrate_store(self, store, poses=None, stride=1):
+        # Fuse every `stride`-th scan of a scan store (see scan_store.py); poses default to the origin
+        for i in range(0, len(store['ranges']), stride):
+            pose = (0.0, 0.0, 0.0) if poses is None else poses[i]
+            self.integrate_scan(store['ranges'][i], store['angle_min'][i], store['angle_increment'][i],
+                                pose, store['range_min'][i], store['range_max'][i])
+
+    def to_dense(self):
+        # One log-odds array over all tiles and the world (x, y) of its cell [0, 0] corner
+        if not self.tiles:
+            return np.zeros((0, 0), dtype=np.float32), (0.0, 0.0)
+        keys = np.array(list(self.tiles))
+        low = keys.min(axis=0)
+        shape = (keys.max(axis=0) - low + 1) * self.tile_size
+        dense = np.zeros(shape, dtype=np.float32)
+        for (tx, ty), tile in self.tiles.items():
+            ox, oy = (tx - low[0]) * self.tile_size, (ty - low[1]) * self.tile_size
+            dense[ox:ox + self.tile_size, oy:oy + self.tile_size] = tile
+        return dense, tuple(low * self.tile_size * self.resolution)
+
+
+if __name__ == "__main__":
+    import time
+    import matplotlib.pyplot as plt
+    from scan_store import load_or_extract
+
+    store = load_or_extract('ex08')
+    grid = OccupancyGrid()
+    start = time.perf_counter()
+    grid.integrate_store(store)
+    seconds = time.perf_counter() - start
+    print(f"Fused {len(store['ranges'])} scans in {seconds:.2f} s "
+          f"({len(store['ranges']) / seconds:.0f} scans/s), {len(grid.tiles)} tiles")
+
+    dense, (x0, y0) = grid.to_dense()
+    extent = (x0, x0 + dense.shape[0] * grid.resolution, y0, y0 + dense.shape[1] * grid.resolution)
+    plt.figure(figsize=(8, 6))
+    plt.imshow(probability(dense).T, origin='lower', extent=extent, cmap='gray_r')
+    plt.colorbar(label='Occupancy probability')
+    plt.title('Occupancy grid from all LiDAR scans')
+    plt.xlabel('X')
+    plt.ylabel('Y')
+    plt.show()
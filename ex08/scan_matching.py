@@ -0,0 +1,133 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from ex08_world_model import polar_to_cartesian
+
+
+def rotation(theta):
+    c, s = np.cos(theta), np.sin(theta)
+    return np.array([[c, -s], [s, c]])
+
+
+def compose(pose, delta):
+    # pose (+) delta: delta expressed in the frame of pose
+    x, y, theta = pose
+    dx, dy = rotation(theta) @ delta[:2]
+    return np.array([x + dx, y + dy, (theta + delta[2] + np.pi) % (2 * np.pi) - np.pi])
+
+
+class ReferenceScan:
+    """Points of the previous scan with a KD-tree and per-point line normals.
+
+    Built once per reference scan and reused by every ICP iteration. The normal of a
+    point is perpendicular to the chord between its scan-order neighbours; points
+    whose neighbours are further apart than `max_gap` (depth jumps) have none.
+    """
+
+    def __init__(self, points, max_gap=0.2):
+        self.points = points
+        self.tree = cKDTree(points)
+        previous = np.roll(points, 1, axis=0)
+        following = np.roll(points, -1, axis=0)
+        tangent = following - previous
+        length = np.hypot(tangent[:, 0], tangent[:, 1])
+        gaps = np.maximum(np.hypot(*(points - previous).T), np.hypot(*(following - points).T))
+        self.has_normal = (length > 0) & (gaps < max_gap)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.normals = np.column_stack((-tangent[:, 1], tangent[:, 0])) / length[:, None]
+
+
+def icp(reference, points, initial=(0.0, 0.0, 0.0), max_iterations=30, max_distance=0.3,
+        outlier_factor=3.0, tolerance=1e-6):
+    """Point-to-line ICP of `points` against a ReferenceScan.
+
+    Returns `(pose, rms, n_inliers)`, where pose (x, y, theta) maps `points` into the
+    reference frame, i.e. the sensor pose at `points` seen from the reference scan.
+    Correspondences are nearest neighbours within `max_distance`; residuals beyond
+    `outlier_factor` times their median absolute value are rejected every iteration.
+    """
+    pose = np.array(initial, dtype=float)
+    rms, n_inliers = np.inf, 0
+    for _ in range(max_iterations):
+        moved = points @ rotation(pose[2]).T + pose[:2]
+        distances, indices = reference.tree.query(moved, distance_upper_bound=max_distance)
+        matched = np.isfinite(distances)
+        matched[matched] = reference.has_normal[indices[matched]]
+        if matched.sum() < 3:
+            break
+        q = moved[matched]
+        normals = reference.normals[indices[matched]]
+        residuals = np.einsum('ij,ij->i', normals, q - reference.points[indices[matched]])
+
+        # Robust outlier rejection around the median residual
+        scale = np.median(np.abs(residuals)) + 1e-9
+        inliers = np.abs(residuals) <= outlier_factor * scale + 1e-3
+        q, normals, residuals = q[inliers], normals[inliers], residuals[inliers]
+        if len(residuals) < 3:
+            break
+
+        # Linearized point-to-line step for a small (tx, ty, dtheta) about the origin
+        jacobian = np.column_stack((normals[:, 0], normals[:, 1],
+                                    normals[:, 1] * q[:, 0] - normals[:, 0] * q[:, 1]))
+        step = np.linalg.lstsq(jacobian, -residuals, rcond=None)[0]
+        rotated = rotation(step[2]) @ pose[:2]
+        pose = np.array([rotated[0] + step[0], rotated[1] + step[1], pose[2] + step[2]])
+        rms, n_inliers = float(np.sqrt(np.mean(residuals ** 2))), len(residuals)
+        if np.abs(step).max() < tolerance:
+            break
+    pose[2] = (pose[2] + np.pi) % (2 * np.pi) - np.pi
+    return pose, rms, n_inliers
+
+
+def scan_odometry(store, stride=1, **icp_options):
+    """Trajectory of the lidar from consecutive scans of a scan store (see scan_store.py).
+
+    Every `stride`-th scan is matched against the previous one, starting from the
+    last relative motion. Returns `(timestamps, poses)` with poses (n, 3) x/y/theta
+    relative to the first scan.
+    """
+    indices = np.arange(0, len(store['ranges']), stride)
+    poses = np.zeros((len(indices), 3))
+    reference = None
+    motion = np.zeros(3)
+    for k, i in enumerate(indices):
+        points = polar_to_cartesian(store['ranges'][i], store['angle_min'][i], store['angle_increment'][i],
+                                    store['range_min'][i], store['range_max'][i])
+        if reference is not None:
+            motion, _, _ = icp(reference, points, motion, **icp_options)
+            poses[k] = compose(poses[k - 1], motion)
+        reference = ReferenceScan(points)
+    return store['timestamps'][indices], poses
+
+
+def wheel_velocities(timestamps, poses, b=1.0):
+    # Right/left wheel speeds that the ex07 kinematic model (axis length b) needs for
+    # the scan-matched motion, so the trajectory can be compared with its drift models
+    dt = np.diff(timestamps) / 1e9
+    local = np.array([rotation(-theta) @ d for theta, d in zip(poses[:-1, 2], np.diff(poses[:, :2], axis=0))])
+    v = local[:, 0] / dt
+    omega = ((np.diff(poses[:, 2]) + np.pi) % (2 * np.pi) - np.pi) / dt
+    return v + 0.5 * b * omega, v - 0.5 * b * omega
+
+
+if __name__ == "__main__":
+    import time
+    import matplotlib.pyplot as plt
+    from scan_store import load_or_extract
+
+    store = load_or_extract('ex08')
+    start = time.perf_counter()
+    timestamps, poses = scan_odometry(store)
+    seconds = time.perf_counter() - start
+    print(f"Matched {len(poses) - 1} scan pairs in {seconds:.2f} s ({1000 * seconds / (len(poses) - 1):.2f} ms/pair)")
+    print(f"Final pose: x={poses[-1, 0]:.3f} y={poses[-1, 1]:.3f} theta={np.degrees(poses[-1, 2]):.1f} deg")
+
+    plt.figure(figsize=(8, 6))
+    plt.plot(poses[:, 0], poses[:, 1], label='Scan-matched trajectory')
+    plt.scatter(poses[0, 0], poses[0, 1], c='green', label='Start')
+    plt.scatter(poses[-1, 0], poses[-1, 1], c='red', label='End')
+    plt.axis('equal')
+    plt.legend()
+    plt.title('Scan-to-scan ICP odometry')
+    plt.xlabel('X')
+    plt.ylabel('Y')
+    plt.show()
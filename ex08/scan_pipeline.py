@@ -0,0 +1,147 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rosbags.rosbag2 import Reader
+from cdr_laserscan import decode_laserscan
+from ex08_world_model import typestore, polar_to_cartesian, split_and_merge_algorithm, fit_segments, line_endpoints
+
+# Line features of one scan: (k, 2) index ranges, (k, 2) rho/alpha,
+# (k, 2, 2) rho/alpha covariances and (k, 2, 2) segment endpoints
+ScanLines = namedtuple('ScanLines', ['timestamp', 'segments', 'lines', 'covariances', 'endpoints'])
+
+_DONE = object()
+
+
+def read_scans(bag_path, topic='/scan'):
+    # Reader + decode stage: (timestamp, Scan) in bag (timestamp) order
+    with Reader(bag_path) as reader:
+        connections = [x for x in reader.connections if x.topic == topic]
+        for connection, timestamp, rawdata in reader.messages(connections=connections):
+            yield timestamp, decode_laserscan(rawdata, connection.msgtype, typestore)
+
+
+def bounded(iterable, maxsize=64):
+    """Run `iterable` in a background thread, handing items over through a bounded queue.
+
+    The producer blocks once `maxsize` items are waiting, so a fast reader can never
+    run ahead of the consumers by more than that.
+    """
+    items = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                if stop.is_set():
+                    return
+        except BaseException as error:
+            items.put(error)
+        items.put(_DONE)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def segment_scan(timestamp, scan, threshold, merge_angle=None, merge_offset=None):
+    # Polar-to-Cartesian + split-and-merge stage for one scan
+    points = polar_to_cartesian(scan.ranges, scan.angle_min, scan.angle_increment, scan.range_min, scan.range_max)
+    segments = split_and_merge_algorithm(points, threshold, merge_angle, merge_offset)
+    fits = fit_segments(points, segments) if len(points) else []
+    return ScanLines(timestamp,
+                     np.array(segments, dtype=np.int64).reshape(-1, 2),
+                     np.array([(line.rho, line.alpha) for line in fits]).reshape(-1, 2),
+                     np.array([line.covariance for line in fits]).reshape(-1, 2, 2),
+                     np.array([line_endpoints(line, points[start], points[end])
+                               for (start, end), line in zip(segments, fits)]).reshape(-1, 2, 2))
+
+
+def segment_batch(batch, threshold, merge_angle, merge_offset):
+    return [segment_scan(timestamp, scan, threshold, merge_angle, merge_offset) for timestamp, scan in batch]
+
+
+def batched(iterable, batch_size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def extract_line_maps(bag_path, threshold=0.5, merge_angle=np.radians(5), merge_offset=0.1,
+                      workers=None, batch_size=32, queue_size=256, topic='/scan'):
+    """Stream line features for every scan of the bag, in timestamp order.
+
+    The reader/decoder runs in a thread behind a bounded queue; segmentation runs
+    on a process pool in batches of `batch_size` scans, with at most two batches per
+    worker in flight. Results are yielded in submission (= timestamp) order.
+    """
+    workers = workers or os.cpu_count() or 1
+    batches = batched(bounded(read_scans(bag_path, topic), queue_size), batch_size)
+    if workers == 1:
+        for batch in batches:
+            yield from segment_batch(batch, threshold, merge_angle, merge_offset)
+        return
+
+    # The reader thread is already running when the workers start; forking a process
+    # with a live thread (and its sqlite/queue locks) can deadlock, so workers are spawned
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(pool.submit(segment_batch, batch, threshold, merge_angle, merge_offset))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def run_pipeline(bag_path, sink=None, **kwargs):
+    """Feed every scan's ScanLines to `sink` (a callable) and report the throughput.
+
+    Returns `(n_scans, seconds, scans_per_second, realtime_factor)`, where the
+    realtime factor is recording duration divided by processing time.
+    """
+    start = time.perf_counter()
+    n_scans = 0
+    first = last = None
+    for scan_lines in extract_line_maps(bag_path, **kwargs):
+        if sink is not None:
+            sink(scan_lines)
+        first = scan_lines.timestamp if first is None else first
+        last = scan_lines.timestamp
+        n_scans += 1
+    seconds = time.perf_counter() - start
+    scans_per_second = n_scans / seconds if seconds > 0 else float('inf')
+    realtime_factor = (last - first) / 1e9 / seconds if n_scans > 1 and seconds > 0 else float('nan')
+    print(f"Processed {n_scans} scans in {seconds:.2f} s: {scans_per_second:.0f} scans/s, "
+          f"{realtime_factor:.1f}x real time")
+    return n_scans, seconds, scans_per_second, realtime_factor
+
+
+if __name__ == "__main__":
+    all_lines = []
+    run_pipeline('ex08', sink=all_lines.append)
+    print(f"Line features: {sum(len(scan_lines.lines) for scan_lines in all_lines)}")
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from rosbags.rosbag2 import Reader
+from ex08_world_model import typestore
+from cdr_laserscan import decode_laserscan
+
+# Per-scan metadata kept next to the ranges matrix
+METADATA_FIELDS = ('angle_min', 'angle_max', 'angle_increment', 'range_min', 'range_max')
+
+
+def extract_scan_matrix(bag_path, topic='/scan'):
+    """Decode every LaserScan of `topic` into contiguous arrays.
+
+    Returns a dict with the `(n_scans, n_beams)` float32 `ranges` matrix, the bag
+    receive times and header stamps in ns (`timestamps`, `stamps`, int64) and one
+    float32 array per field in METADATA_FIELDS. Scans with fewer beams than the
+    widest one are padded with NaN.
+    """
+    with Reader(bag_path) as reader:
+        connections = [x for x in reader.connections if x.topic == topic]
+        n_scans = sum(connection.msgcount for connection in connections)
+        rows = []
+        timestamps = np.zeros(n_scans, dtype=np.int64)
+        stamps = np.zeros(n_scans, dtype=np.int64)
+        metadata = {field: np.zeros(n_scans, dtype=np.float32) for field in METADATA_FIELDS}
+        i = 0
+        for connection, timestamp, rawdata in reader.messages(connections=connections):
+            msg = decode_laserscan(rawdata, connection.msgtype, typestore)
+            rows.append(msg.ranges)
+            timestamps[i] = timestamp
+            stamps[i] = msg.stamp
+            for field in METADATA_FIELDS:
+                metadata[field][i] = getattr(msg, field)
+            i += 1
+
+    n_beams = max((len(row) for row in rows), default=0)
+    ranges = np.full((i, n_beams), np.nan, dtype=np.float32)
+    for j, row in enumerate(rows):
+        ranges[j, :len(row)] = row
+    store = {'ranges': ranges, 'timestamps': timestamps[:i], 'stamps': stamps[:i]}
+    store.update({field: values[:i] for field, values in metadata.items()})
+    return store
+
+
+def save_scan_store(path, store, compressed=True):
+    # .npz with one array per field; compression roughly halves the lidar ranges
+    if compressed:
+        np.savez_compressed(path, **store)
+    else:
+        np.savez(path, **store)
+
+
+def load_scan_store(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_or_extract(bag_path, store_path=None, topic='/scan'):
+    # Parse the bag once, afterwards load the columnar store
+    store_path = store_path or os.path.join(bag_path, 'scans.npz')
+    if os.path.exists(store_path):
+        return load_scan_store(store_path)
+    store = extract_scan_matrix(bag_path, topic)
+    save_scan_store(store_path, store)
+    return store
+
+
+if __name__ == "__main__":
+    store = load_or_extract('ex08')
+    duration = (store['timestamps'][-1] - store['timestamps'][0]) / 1e9
+    print(f"Scans: {store['ranges'].shape[0]}  beams: {store['ranges'].shape[1]}  duration: {duration:.2f} s")
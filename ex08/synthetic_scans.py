@@ -0,0 +1,205 @@
+import numpy as np
+from cdr_laserscan import Scan, LASERSCAN_TYPE, encode_laserscan
+from scan_store import METADATA_FIELDS
+
+# Wall blocks of the TurtleBot4 maze (TurtleBot4Maze.jpeg) on its 1 m floor grid,
+# as (x_min, y_min, x_max, y_max) rectangles inside the 16 m x 11 m arena
+MAZE_BLOCKS = [
+    (2, 9, 4, 10), (3, 8, 5, 9), (4, 7, 6, 8), (5, 6, 7, 7), (6, 5, 8, 6),  # staircase
+    (1, 6, 3, 7), (2, 4, 5, 5), (4, 3, 6, 4),                               # left zig-zag
+    (1, 1, 9, 3),                                                           # long bottom block
+    (10, 4, 11, 11), (8, 8, 10, 9), (11, 4, 13, 5),                         # T
+    (12, 1, 14, 2), (13, 2, 14, 3),                                         # L
+    (14, 4, 15, 10), (15, 7, 16, 8),                                        # right column
+]
+MAZE_SIZE = (16.0, 11.0)
+# Free corridor around the robot's spawn point, used as the default trajectory
+MAZE_WAYPOINTS = [(6.5, 4.5), (9.5, 4.5), (9.5, 7.5), (9.5, 4.5), (6.5, 4.5)]
+# (pose, wall, beam) candidates per raycast_fan batch, about 120 MB of temporaries
+RAYCAST_ELEMENTS = 2_000_000
+
+
+def polygon_walls(vertices, closed=True):
+    # (n, 2, 2) wall segments along a polyline / polygon
+    vertices = np.asarray(vertices, dtype=float)
+    ends = np.roll(vertices, -1, axis=0) if closed else vertices[1:]
+    return np.stack((vertices[:len(ends)], ends), axis=1)
+
+
+def maze_walls(blocks=MAZE_BLOCKS, size=MAZE_SIZE):
+    # Outer arena plus the four sides of every block
+    walls = [polygon_walls([(0, 0), (size[0], 0), size, (0, size[1])])]
+    for x0, y0, x1, y1 in blocks:
+        walls.append(polygon_walls([(x0, y0), (x1, y0), (x1, y1), (x0, y1)]))
+    return np.concatenate(walls)
+
+
+def trajectory(waypoints, n_scans):
+    """n_scans (x, y, theta) poses spaced evenly along a waypoint polyline, heading along it."""
+    waypoints = np.asarray(waypoints, dtype=float)
+    legs = np.diff(waypoints, axis=0)
+    distance = np.r_[0, np.cumsum(np.hypot(legs[:, 0], legs[:, 1]))]
+    s = np.linspace(0, distance[-1], n_scans)
+    leg = np.clip(np.searchsorted(distance, s, 'right') - 1, 0, len(legs) - 1)
+    fraction = (s - distance[leg]) / np.maximum(distance[leg + 1] - distance[leg], 1e-12)
+    xy = waypoints[leg] + fraction[:, None] * legs[leg]
+    return np.column_stack((xy, np.arctan2(legs[leg, 1], legs[leg, 0])))
+
+
+def raycast(walls, pose, cos_table, sin_table, range_max):
+    # Distance along every beam (sensor frame angles) to the nearest wall, inf beyond range_max
+    x, y, theta = pose
+    c, s = np.cos(theta), np.sin(theta)
+    dx = (c * cos_table - s * sin_table)[:, None]
+    dy = (s * cos_table + c * sin_table)[:, None]
+    ax, ay = walls[:, 0, 0] - x, walls[:, 0, 1] - y
+    ex, ey = walls[:, 1, 0] - walls[:, 0, 0], walls[:, 1, 1] - walls[:, 0, 1]
+    # Solve p + t*d = a + u*e for t (range) and u (position along the wall)
+    denominator = dx * ey - dy * ex
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = (ax * ey - ay * ex) / denominator
+        u = (ax * dy - ay * dx) / denominator
+    t[(denominator == 0) | (u < 0) | (u > 1) | (t <= 0)] = np.inf
+    ranges = t.min(axis=1)
+    ranges[ranges > range_max] = np.inf
+    return ranges
+
+
+def raycast_fan(walls, poses, angle_min, angle_increment, n_beams, range_max, max_elements=RAYCAST_ELEMENTS):
+    """(n_poses, n_beams) ranges of an evenly spaced beam fan from every pose, inf beyond range_max.
+
+    Gives the same ranges as `raycast` pose by pose, but only intersects a wall with the
+    beams inside its angular span seen from the pose (a few walls per beam instead of
+    all of them), for all poses at once. The (pose, wall, beam) candidates are expanded
+    into flat arrays in pose batches of at most `max_elements` candidates.
+    """
+    poses = np.asarray(poses, dtype=float).reshape(-1, 3)
+    n_poses = len(poses)
+    # Wall end points relative to every pose in its sensor frame: (n_poses, n_walls, 2)
+    x, y, theta = (poses[:, i, None, None] for i in range(3))
+    c, s = np.cos(theta), np.sin(theta)
+    rx, ry = walls[None, :, :, 0] - x, walls[None, :, :, 1] - y
+    px, py = c * rx + s * ry, c * ry - s * rx
+    # Angular span of every wall, as beam index intervals [first, last]; a span that
+    # wraps past angle_min + 2 pi continues at the start of the fan, hence two per wall
+    bearings = np.arctan2(py, px)
+    span = (bearings[..., 1] - bearings[..., 0] + np.pi) % (2 * np.pi) - np.pi
+    low = angle_min + (bearings[..., 0] + np.minimum(span, 0) - angle_min) % (2 * np.pi)
+    low = np.stack((low, low - 2 * np.pi), axis=-1)
+    high = low + np.abs(span)[..., None]
+    first = np.maximum(np.ceil((low - angle_min) / angle_increment), 0).astype(np.int64)
+    last = np.minimum(np.floor((high - angle_min) / angle_increment), n_beams - 1).astype(np.int64)
+    counts = np.maximum(last - first + 1, 0).reshape(n_poses, -1)
+    # Range along beam d to the line through a with direction e: (a x e) / (d x e)
+    ax, ay = px[..., 0], py[..., 0]
+    ex, ey = px[..., 1] - ax, py[..., 1] - ay
+    numerator = np.repeat(ax * ey - ay * ex, 2, axis=-1)
+    ex, ey = np.repeat(ex, 2, axis=-1), np.repeat(ey, 2, axis=-1)
+    angles = angle_min + np.arange(n_beams) * angle_increment
+    cos_table, sin_table = np.cos(angles), np.sin(angles)
+
+    ranges = np.full((n_poses, n_beams), np.inf)
+    per_pose = counts.sum(axis=1)
+    start = 0
+    while start < n_poses:
+        # As many poses as fit into max_elements candidates, at least one
+        stop = start + max(int(np.searchsorted(np.cumsum(per_pose[start:]), max_elements, 'right')), 1)
+        batch_counts = counts[start:stop].ravel()
+        beams = np.repeat(first[start:stop].ravel() - np.cumsum(batch_counts) + batch_counts, batch_counts)
+        beams += np.arange(len(beams))
+        # Per-wall values repeated over the wall's candidate beams
+        pair = lambda values: np.repeat(values[start:stop].ravel(), batch_counts)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = pair(numerator) / (cos_table[beams] * pair(ey) - sin_table[beams] * pair(ex))
+        # Parallel beams (0/0) and walls through the pose never count as hits
+        t[~(t > 0)] = np.inf
+        rows = np.repeat(np.arange(stop - start) * n_beams, per_pose[start:stop])
+        np.minimum.at(ranges[start:stop].reshape(-1), rows + beams, t)
+        start = stop
+    ranges[ranges > range_max] = np.inf
+    return ranges
+
+
+def generate_scans(walls, poses, n_beams=640, range_min=0.164, range_max=12.0, sigma_0=0.01,
+                   sigma_per_meter=0.01, dropout=0.0, scan_rate=15.0, start_time=0, seed=0, chunk_size=1000):
+    """Yield LaserScans of `walls` seen from `poses`, in scan-store chunks of `chunk_size` scans.
+
+    Every chunk is a dict like scan_store.extract_scan_matrix returns. Beams cover
+    [-pi, pi] as on the TurtleBot4 lidar; range noise is Gaussian with the
+    range-dependent sigma of ex08_world_model.range_sigmas. Beams without a wall
+    within `range_max`, and a `dropout` fraction of the others, return inf. Scans are `1 / scan_rate` s apart.
+    """
+    rng = np.random.default_rng(seed)
+    angle_min, angle_max = -np.pi, np.pi
+    angle_increment = (angle_max - angle_min) / (n_beams - 1)
+    walls = np.asarray(walls, dtype=float)
+    metadata = {'angle_min': angle_min, 'angle_max': angle_max, 'angle_increment': angle_increment,
+                'range_min': range_min, 'range_max': range_max}
+    for first in range(0, len(poses), chunk_size):
+        chunk = poses[first:first + chunk_size]
+        ranges = raycast_fan(walls, chunk, angle_min, angle_increment, n_beams, range_max)
+        # Noise is drawn scan by scan, so the output does not depend on chunk_size
+        noise = np.empty_like(ranges)
+        dropped = np.empty(ranges.shape, dtype=bool)
+        for k in range(len(chunk)):
+            noise[k] = rng.normal(size=n_beams)
+            dropped[k] = rng.random(n_beams) < dropout
+        # Beams without a wall within range_max stay inf
+        hit = np.isfinite(ranges)
+        ranges[hit] = np.maximum(ranges[hit] + noise[hit] * (sigma_0 + sigma_per_meter * ranges[hit]), range_min)
+        ranges[dropped] = np.inf
+        timestamps = start_time + ((first + np.arange(len(chunk))) * 1e9 / scan_rate).astype(np.int64)
+        store = {'ranges': ranges.astype(np.float32), 'timestamps': timestamps, 'stamps': timestamps.copy()}
+        store.update({field: np.full(len(chunk), metadata[field], dtype=np.float32) for field in METADATA_FIELDS})
+        yield store
+
+
+def synthesize_store(walls, poses, **options):
+    # All generated scans as one scan store
+    chunks = list(generate_scans(walls, poses, **options))
+    return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in chunks[0]}
+
+
+def write_rosbag(bag_path, chunks, topic='/scan', frame_id='turtlebot4/rplidar_link/rplidar'):
+    """Write scan-store chunks as a rosbag2 (sqlite3) with the recorded bag's /scan schema."""
+    from rosbags.rosbag2 import Writer
+    from ex08_world_model import typestore
+
+    n_scans = 0
+    with Writer(bag_path, version=8) as writer:
+        connection = writer.add_connection(topic, LASERSCAN_TYPE, typestore=typestore)
+        for chunk in chunks:
+            for k in range(len(chunk['ranges'])):
+                scan = Scan(chunk['stamps'][k], *(chunk[field][k] for field in METADATA_FIELDS), chunk['ranges'][k])
+                writer.write(connection, int(chunk['timestamps'][k]), encode_laserscan(scan, frame_id))
+                n_scans += 1
+    return n_scans
+
+
+if __name__ == "__main__":
+    import time
+    import matplotlib.pyplot as plt
+    from ex08_world_model import polar_to_cartesian
+
+    walls = maze_walls()
+    poses = trajectory(MAZE_WAYPOINTS, 1000)
+    start = time.perf_counter()
+    store = synthesize_store(walls, poses, dropout=0.01)
+    seconds = time.perf_counter() - start
+    print(f"Generated {len(poses)} scans of {store['ranges'].shape[1]} beams in {seconds:.2f} s")
+
+    plt.figure(figsize=(8, 6))
+    for wall in walls:
+        plt.plot(wall[:, 0], wall[:, 1], c='gray')
+    x, y, theta = poses[0]
+    points = polar_to_cartesian(store['ranges'][0], store['angle_min'][0], store['angle_increment'][0])
+    c, s = np.cos(theta), np.sin(theta)
+    plt.scatter(x + c * points[:, 0] - s * points[:, 1], y + s * points[:, 0] + c * points[:, 1], s=4, c='blue',
+                label='Synthetic scan')
+    plt.plot(poses[:, 0], poses[:, 1], c='red', label='Trajectory')
+    plt.axis('equal')
+    plt.legend()
+    plt.title('Synthetic LaserScan in the TurtleBot4 maze')
+    plt.xlabel('X')
+    plt.ylabel('Y')
+    plt.show()
@@ -0,0 +1,128 @@
+import numpy as np
+
+COLORS = {'white': 0, 'black': 1}
+# Motion kernels with more taps than this are convolved with an FFT, shorter ones
+# are applied as shifted adds (a sparse convolution); on 10^6 tiles both take
+# about 60 ms at 40 taps
+SPARSE_TAPS = 40
+
+
+def encode_tiles(platform):
+    # Colour names (ex09 platform list) or an int array of colour indices
+    if len(platform) and isinstance(platform[0], str):
+        return np.array([COLORS[color] for color in platform], dtype=np.int8)
+    return np.asarray(platform)
+
+
+def motion_kernel(direction, action_noise):
+    # move_left/move_right of task 2b: the intended step, or the opposite one with probability action_noise
+    return np.array([direction, -direction]), np.array([1 - action_noise, action_noise])
+
+
+def fft_size(n):
+    # Smallest 2^a * 3^b * 5^c >= n; FFT lengths with large prime factors are slow
+    best = 1 << int(np.ceil(np.log2(max(n, 1))))
+    power_5 = 1
+    while power_5 < best:
+        power_35 = power_5
+        while power_35 < best:
+            size = power_35 << max(int(np.ceil(np.log2(n / power_35))), 0)
+            best = min(best, size)
+            power_35 *= 3
+        power_5 *= 5
+    return best
+
+
+def predict(belief, offsets, weights):
+    """Belief after a move that shifts the robot by offsets[i] with probability weights[i].
+
+    A move that would leave the platform keeps the robot on its tile, as in task 2b,
+    so that part of the mass stays where it is. Costs O(n * taps) for short kernels
+    and O(n log n) with an FFT for long ones.
+    """
+    n = len(belief)
+    offsets = np.asarray(offsets)
+    if len(offsets) <= SPARSE_TAPS:
+        moved = np.zeros_like(belief)
+        for offset, weight in zip(offsets, weights):
+            if abs(offset) >= n:
+                continue  # leaves the platform from every tile, all of it is blocked below
+            if offset >= 0:
+                moved[offset:] += weight * belief[:n - offset]
+            else:
+                moved[:n + offset] += weight * belief[-offset:]
+    else:
+        low, high = offsets.min(), offsets.max()
+        kernel = np.zeros(high - low + 1)
+        np.add.at(kernel, offsets - low, weights)
+        size = fft_size(n + len(kernel) - 1)
+        full = np.fft.irfft(np.fft.rfft(belief, size) * np.fft.rfft(kernel, size), size)
+        # full[j] is the mass arriving at tile j + low
+        padded = np.r_[np.zeros(max(low, 0)), full, np.zeros(max(-high, 0))]
+        moved = padded[max(low, 0) - low:max(low, 0) - low + n]
+    # Blocked moves: the mass that would cross an end stays put (all of it for |offset| >= n)
+    for offset, weight in zip(offsets, weights):
+        k = min(abs(offset), n)
+        if offset > 0:
+            moved[n - k:] += weight * belief[n - k:]
+        elif offset < 0:
+            moved[:k] += weight * belief[:k]
+    return moved
+
+
+class BayesFilter:
+    """Histogram localization over the tiles of a platform.
+
+    `belief` is a probability vector over tiles. Every move convolves it with the
+    motion kernel (predict) and every colour reading multiplies it with the sensor
+    likelihood (update). The prior is uniform unless a start tile is given.
+    """
+
+    def __init__(self, platform, action_noise=0.1, sensor_noise=0.1, start=None):
+        self.tiles = encode_tiles(platform)
+        self.action_noise = action_noise
+        n = len(self.tiles)
+        # Likelihood of every tile for each perceived colour
+        self.likelihood = {color: np.where(self.tiles == index, 1 - sensor_noise, sensor_noise)
+                           for color, index in COLORS.items()}
+        if start is None:
+            self.belief = np.full(n, 1.0 / n)
+        else:
+            self.belief = np.zeros(n)
+            self.belief[start] = 1.0
+
+    def predict(self, direction):
+        self.belief = predict(self.belief, *motion_kernel(direction, self.action_noise))
+
+    def update(self, color):
+        self.belief *= self.likelihood[color]
+        self.belief /= self.belief.sum()
+
+    def step(self, direction, color):
+        self.predict(direction)
+        self.update(color)
+
+    def estimate(self):
+        # Most likely tile
+        return int(np.argmax(self.belief))
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    n = 1_000_000
+    bayes = BayesFilter(rng.integers(0, 2, n))
+    start = time.perf_counter()
+    for _ in range(20):
+        bayes.step(1, 'white')
+    print(f"Sparse predict + update on {n} tiles: {1000 * (time.perf_counter() - start) / 20:.2f} ms/step")
+
+    # A slippery floor: the robot may slide up to 40 tiles
+    offsets = np.arange(-40, 41)
+    weights = np.exp(-0.5 * ((offsets - 1) / 10.0) ** 2)
+    weights /= weights.sum()
+    start = time.perf_counter()
+    for _ in range(5):
+        bayes.belief = predict(bayes.belief, offsets, weights)
+    print(f"FFT predict with a {len(offsets)}-tap kernel on {n} tiles: {1000 * (time.perf_counter() - start) / 5:.2f} ms/step")
@@ -0,0 +1,88 @@
+import math
+import numpy as np
+
+# log((n - 1)!) = lgamma(n) for n = 0, 1, 2, ...; grown on demand. Histogram counts are
+# integers, so their Beta log-normalisers are table lookups instead of lgamma calls.
+_log_factorials = np.zeros(2)
+_vector_lgamma = np.vectorize(math.lgamma, otypes=[float])
+
+
+def lgamma(values):
+    global _log_factorials
+    values = np.asarray(values, dtype=float)
+    if values.size and np.all(values == np.round(values)) and values.min() >= 1:
+        largest = int(values.max())
+        if largest >= len(_log_factorials):
+            n = max(largest + 1, 2 * len(_log_factorials))
+            _log_factorials = np.r_[0.0, np.cumsum(np.log(np.maximum(np.arange(n - 1), 1)))]
+        return _log_factorials[values.astype(np.int64)]
+    return _vector_lgamma(values)
+
+
+def beta_mean(a, b):
+    return a / (a + b)
+
+
+def beta_variance(a, b):
+    total = a + b
+    return a * b / (total * total * (total + 1))
+
+
+def beta_log_pdf(x, a, b):
+    # log density of Beta(a, b) at x, broadcast over x and the (a, b) arrays
+    log_norm = lgamma(a + b) - lgamma(a) - lgamma(b)
+    # (a - 1) * log(x) is 0 for a == 1 even at x = 0, like scipy's xlogy
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (log_norm + np.where(a == 1, 0.0, (a - 1) * np.log(x))
+                + np.where(b == 1, 0.0, (b - 1) * np.log1p(-x)))
+
+
+class BetaPosterior:
+    """Conjugate Beta-Bernoulli posteriors for every tile (and robot) at once.
+
+    `alpha` counts 'black' and `beta` 'white' observations, as in task 2c; both are
+    integer arrays of any shape (tiles, or robots x tiles). Mean and variance are
+    cached until the next observation, log-pdf grids per grid until then.
+    """
+
+    def __init__(self, alpha, beta):
+        self.alpha = np.array(alpha, dtype=np.int64)
+        self.beta = np.array(beta, dtype=np.int64)
+        self._mean = self._variance = None
+        self._grids = {}
+
+    @classmethod
+    def uniform(cls, shape):
+        # Beta(1, 1) prior everywhere
+        return cls(np.ones(shape, dtype=np.int64), np.ones(shape, dtype=np.int64))
+
+    def observe(self, index, black):
+        # Count one observation per index (an int, or index arrays for a batch)
+        black = np.asarray(black, dtype=bool)
+        np.add.at(self.alpha, index, black)
+        np.add.at(self.beta, index, ~black)
+        self._mean = self._variance = None
+        self._grids = {}
+
+    @property
+    def mean(self):
+        if self._mean is None:
+            self._mean = beta_mean(self.alpha, self.beta)
+        return self._mean
+
+    @property
+    def variance(self):
+        if self._variance is None:
+            self._variance = beta_variance(self.alpha, self.beta)
+        return self._variance
+
+    def log_pdf_grid(self, x):
+        """Log densities of every posterior on the points `x`, shape alpha.shape + x.shape."""
+        x = np.asarray(x, dtype=float)
+        key = (x.shape, x.tobytes())
+        if key not in self._grids:
+            self._grids[key] = beta_log_pdf(x, self.alpha[..., None], self.beta[..., None])
+        return self._grids[key]
+
+    def pdf_grid(self, x):
+        return np.exp(self.log_pdf_grid(x))
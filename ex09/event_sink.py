@@ -0,0 +1,101 @@
+import json
+import os
+import sys
+from collections import deque
+
+# Where the robots' messages and step events go. Every sink has
+#   log(message) - the human-readable lines the scripts used to print
+#   record(**event) - one structured step event (action, tile, perception, prediction, error)
+# The sink is picked with EVENT_SINK=console|silent|ring|ndjson:<path> (default console).
+
+
+class ConsoleSink:
+    """Prints every message, like the scripts always did; events are not kept."""
+
+    def log(self, message):
+        print(message)
+
+    def record(self, **event):
+        pass
+
+    def close(self):
+        pass
+
+
+class SilentSink(ConsoleSink):
+    """Drops everything, for big batches at full speed."""
+
+    def log(self, message):
+        pass
+
+
+class RingBufferSink(SilentSink):
+    """Keeps the last `capacity` step events in memory, messages are dropped."""
+
+    def __init__(self, capacity=100_000):
+        self.events = deque(maxlen=capacity)
+
+    def record(self, **event):
+        self.events.append(event)
+
+
+class NDJSONSink(SilentSink):
+    """Appends step events as newline-delimited JSON, written `batch_size` lines at a time."""
+
+    def __init__(self, path, batch_size=1000):
+        self.file = open(path, 'w')
+        self.batch_size = batch_size
+        self.pending = []
+
+    def record(self, **event):
+        self.pending.append(json.dumps(event))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write('\n'.join(self.pending) + '\n')
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def make_sink(mode='console'):
+    # 'console', 'silent', 'ring', 'ring:<capacity>' or 'ndjson:<path>'
+    kind, _, argument = mode.partition(':')
+    if kind == 'console':
+        return ConsoleSink()
+    if kind == 'silent':
+        return SilentSink()
+    if kind == 'ring':
+        return RingBufferSink(int(argument)) if argument else RingBufferSink()
+    if kind == 'ndjson' and argument:
+        return NDJSONSink(argument)
+    raise ValueError(f"Unknown event sink: {mode}")
+
+
+def sink_from_env(default='console'):
+    return make_sink(os.environ.get('EVENT_SINK', default))
+
+
+def read_events(path):
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def replay(events, file=sys.stdout):
+    """Print recorded step events one line each, e.g. to debug a single episode."""
+    for event in events:
+        print(', '.join(f"{key}: {value}" for key, value in event.items()), file=file)
+
+
+if __name__ == "__main__":
+    # python ex09/event_sink.py events.ndjson [key=value ...] replays the matching events
+    # (ex03 imports this module too, so its event files replay the same way)
+    filters = dict(argument.split('=', 1) for argument in sys.argv[2:])
+    replay(event for event in read_events(sys.argv[1])
+           if all(str(event.get(key)) == value for key, value in filters.items()))
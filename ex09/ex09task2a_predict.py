@@ -1,10 +1,14 @@
 import random
 from collections import defaultdict
+import matplotlib
 import matplotlib.pyplot as plt
+from event_sink import ConsoleSink, sink_from_env
 
 class Robot:
-    def __init__(self, platform):
+    def __init__(self, platform, sink=None):
         self.platform = platform
+        # Messages and step events go to the sink (console output by default)
+        self.sink = sink or ConsoleSink()
         self.position = 0 
         self.histograms = defaultdict(lambda: {'white': 1, 'black': 1})
         self.positions = []
@@ -25,15 +29,15 @@ class Robot:
         self.report_position()
 
     def report_position(self):
-        print(f"The robot is on the {self.platform[self.position]} tile at position {self.position}.")
+        self.sink.log(f"The robot is on the {self.platform[self.position]} tile at position {self.position}.")
         self.positions.append(self.position)
         self.print_histogram(self.position)
 
     def print_histogram(self, position):
         histogram = self.histograms[position]
-        print(f"Histogram for position {position}:")
+        self.sink.log(f"Histogram for position {position}:")
         for color, count in histogram.items():
-            print(f"  {color}: {count}")
+            self.sink.log(f"  {color}: {count}")
 
     def sensing_color(self, noise=0.1):
         perceived_color = self.platform[self.position]
@@ -59,34 +63,40 @@ class Robot:
 
     def simulate(self, steps):
         error = 0
-        for _ in range(steps):
+        for step in range(steps):
             action = self.choose_action()
             next_position = self.position - 1 if action == 'left' else self.position + 1
             predicted_color = self.predict_color(next_position)
-            print(f"Predicted color for position {next_position}: {predicted_color}")
+            self.sink.log(f"Predicted color for position {next_position}: {predicted_color}")
             if action == 'left':
                 self.move_left()
             else:
                 self.move_right()
-            if predicted_color != self.platform[self.position]:
-                print("The prediction was incorrect.")
+            tile = self.platform[self.position]
+            if predicted_color != tile:
+                self.sink.log("The prediction was incorrect.")
                 error += 1
             self.errors.append(error / (len(self.positions) + 1))
-        print(f"\nerror: {error}  step: {steps}")
-        print(f"Total error rate: {error / steps}")
+            self.sink.record(step=step + 1, action=action, position=self.position, tile=tile,
+                             perceived=tile, predicted=predicted_color, error=predicted_color != tile)
+        self.sink.log(f"\nerror: {error}  step: {steps}")
+        self.sink.log(f"Total error rate: {error / steps}")
         return error / steps
 
 # Test the Robot class with a platform of more than two tiles
 platform = ['white', 'black', 'white', 'white']
-robot = Robot(platform)
+# EVENT_SINK=silent|ring|ndjson:<path> replaces the console output
+sink = sink_from_env()
+robot = Robot(platform, sink)
 
 error_rates = robot.simulate(20)
 positions = robot.positions
 errors = robot.errors
-print("\n------------------------------------")
-print("\nFinal histograms:")
+sink.log("\n------------------------------------")
+sink.log("\nFinal histograms:")
 for position in range(len(platform)):
     robot.print_histogram(position)
+sink.close()
 
 plt.figure(figsize=(12, 8))
 
@@ -114,4 +124,7 @@ for i in range(len(platform)):
     plt.ylabel('Count')
 
 plt.tight_layout()
-plt.show()
+if matplotlib.get_backend().lower() == 'agg':  # headless run (MPLBACKEND=Agg)
+    plt.savefig('ex09/ex09task2a_predict.png')
+else:
+    plt.show()
@@ -1,18 +1,29 @@
 import random
 from collections import defaultdict
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
+from event_sink import ConsoleSink, sink_from_env
+from bayes_filter import BayesFilter
 
 class Robot:
-    def __init__(self, platform):
+    def __init__(self, platform, sink=None, belief=False):
         self.platform = platform
+        # Messages and step events go to the sink (console output by default)
+        self.sink = sink or ConsoleSink()
         self.position = 0 
+        # Belief-state mode: the robot does not know self.position (moves are noisy),
+        # it tracks a probability vector over tiles and acts on its most likely tile
+        self.belief = BayesFilter(platform, start=0) if belief else None
+        self.last_direction = 0
+        self.localization_errors = 0
         self.histograms = defaultdict(lambda: {'white': 1, 'black': 1})
         self.read_color = "default"
         self.positions = []
         self.errors = []
         
     def move_left(self,noise=0.1):
+        self.last_direction = -1
         randnum = random.random()
         if self.position > 0 and randnum > noise:
             self.position -= 1
@@ -23,6 +34,7 @@ class Robot:
         self.update_histogram()
 
     def move_right(self,noise=0.1):
+        self.last_direction = 1
         randnum = random.random()
         if self.position < len(self.platform) - 1 and randnum > noise:
             self.position += 1
@@ -32,9 +44,14 @@ class Robot:
             self.position = min(len(self.platform) - 1, self.position)
         self.update_histogram()
 
+    def estimated_position(self):
+        return self.position if self.belief is None else self.belief.estimate()
+
     def update_histogram(self):
         perceived_color = self.sensing_color()
-        self.histograms[self.position][perceived_color] += 1
+        if self.belief is not None:
+            self.belief.step(self.last_direction, perceived_color)
+        self.histograms[self.estimated_position()][perceived_color] += 1
         self.report_position()
 
     def sensing_color(self, noise=0.1):
@@ -45,15 +62,19 @@ class Robot:
         return perceived_color
 
     def report_position(self):
-        print(f"The robot is on the {self.platform[self.position]} tile at position {self.position}.")
+        self.sink.log(f"The robot is on the {self.platform[self.position]} tile at position {self.position}.")
         self.positions.append(self.position)
-        self.print_histogram(self.position)
+        if self.belief is not None:
+            estimate = self.estimated_position()
+            self.localization_errors += estimate != self.position
+            self.sink.log(f"The robot believes it is at position {estimate} (p = {self.belief.belief[estimate]:.2f}).")
+        self.print_histogram(self.estimated_position())
 
     def print_histogram(self, position):
         histogram = self.histograms[position]
-        print(f"Histogram for position {position}:")
+        self.sink.log(f"Histogram for position {position}:")
         for color, count in histogram.items():
-            print(f"  {color}: {count}")
+            self.sink.log(f"  {color}: {count}")
 
     def predict_color(self, position):
 
@@ -64,8 +85,9 @@ class Robot:
         return 'white' if probability_white > probability_black else 'black'
 
     def choose_action_cautious(self):
-        left_position = max(0, self.position - 1)
-        right_position = min(len(self.platform) - 1, self.position + 1)
+        position = self.estimated_position()
+        left_position = max(0, position - 1)
+        right_position = min(len(self.platform) - 1, position + 1)
 
         delta_left = self.calculate_delta(left_position)
         delta_right = self.calculate_delta(right_position)
@@ -78,8 +100,9 @@ class Robot:
             return random.choice(['left', 'right'])
 
     def choose_action_adventurous(self):
-        left_position = max(0, self.position - 1)
-        right_position = min(len(self.platform) - 1, self.position + 1)
+        position = self.estimated_position()
+        left_position = max(0, position - 1)
+        right_position = min(len(self.platform) - 1, position + 1)
 
         delta_left = self.calculate_delta(left_position)
         delta_right = self.calculate_delta(right_position)
@@ -110,55 +133,78 @@ class Robot:
         error = 0
         self.errors = []
         self.sensing_color()
-        for _ in range(steps):
-            print("\n------------------------------------")
-            print(f"Step {_ + 1}")
+        if self.belief is not None:
+            self.belief.update(self.read_color)
+        for step in range(steps):
+            self.sink.log("\n------------------------------------")
+            self.sink.log(f"Step {step + 1}")
             if strategy == 'cautious':
                 action = self.choose_action_cautious()
             else:
                 action = self.choose_action_adventurous()
 
-            next_position = self.position - 1 if action == 'left' else self.position + 1
+            position = self.estimated_position()
+            next_position = position - 1 if action == 'left' else position + 1
             predicted_color = self.predict_color(next_position)
-            print(f"Predicted color for position {next_position}: {predicted_color}")
+            self.sink.log(f"Predicted color for position {next_position}: {predicted_color}")
 
             if action == 'left':
                 self.move_left()
             else:
                 self.move_right()
 
+            # In belief mode the prediction is checked against the tile the robot believes it is on
+            tile = self.platform[self.estimated_position()]
             if next_position < 0 or next_position >= len(self.platform):
-                print("Prediction was for out-of-bounds position.")
+                self.sink.log("Prediction was for out-of-bounds position.")
+                self.sink.record(strategy=strategy, step=step + 1, action=action, position=self.position,
+                                 believed=self.estimated_position(), tile=tile,
+                                 perceived=self.read_color, predicted=None, error=None)
                 continue
 
-            if predicted_color != self.platform[self.position]:
-                print("The prediction was incorrect.")
+            if predicted_color != tile:
+                self.sink.log("The prediction was incorrect.")
                 error += 1
 
             self.errors.append(error / (len(self.positions) + 1))
-
-        print(f"\nError: {error}  Steps: {steps}")
-        print(f"Total error rate: {error / steps}")
+            self.sink.record(strategy=strategy, step=step + 1, action=action, position=self.position,
+                             believed=self.estimated_position(), tile=tile,
+                             perceived=self.read_color, predicted=predicted_color, error=predicted_color != tile)
+
+        self.sink.log(f"\nError: {error}  Steps: {steps}")
+        self.sink.log(f"Total error rate: {error / steps}")
+        if self.belief is not None:
+            self.sink.log(f"Steps with a wrong position estimate: {self.localization_errors}")
         return error / steps
     
 platform = ['white', 'black', 'white', 'white']
-robot = Robot(platform)
+# EVENT_SINK=silent|ring|ndjson:<path> replaces the console output
+sink = sink_from_env()
+robot = Robot(platform, sink)
 # Simulate for cautious robot
 cautious_error_rate = robot.simulate(20, strategy='cautious')
 cautious_positions = robot.positions
 cautious_errors = robot.errors
 
-robot = Robot(platform)
+robot = Robot(platform, sink)
 # Simulate for adventurous robot
 adventurous_error_rate = robot.simulate(20, strategy='adventurous')
 adventurous_positions = robot.positions
 adventurous_errors = robot.errors
 
+robot = Robot(platform, sink, belief=True)
+# Simulate for cautious robot that localizes itself with a Bayes filter
+belief_error_rate = robot.simulate(20, strategy='cautious')
+belief_positions = robot.positions
+belief_errors = robot.errors
+sink.close()
+
 plt.figure(figsize=(10, 6))
 
 plt.subplot(2, 1, 1)
 plt.plot(cautious_positions, label='Cautious Robot')
 plt.plot(adventurous_positions, label='Adventurous Robot', linestyle='--')
+plt.plot(belief_positions, label='Cautious Robot (belief state)', linestyle=':')
 plt.title('Robot Positions Over Time')
 plt.xticks(range(21))
 plt.yticks(range(4))
@@ -170,6 +216,7 @@ plt.legend()
 plt.subplot(2, 1, 2)
 plt.plot(cautious_errors, label='Cautious Robot')
 plt.plot(adventurous_errors, label='Adventurous Robot', linestyle='--')
+plt.plot(belief_errors, label='Cautious Robot (belief state)', linestyle=':')
 plt.title('Error Rates Over Time')
 plt.xticks(range(21))
 plt.xlabel('Time Steps')
@@ -177,4 +224,7 @@ plt.ylabel('Error Rate')
 plt.legend()
 
 plt.tight_layout()
-plt.show()
+if matplotlib.get_backend().lower() == 'agg':  # headless run (MPLBACKEND=Agg)
+    plt.savefig('ex09/ex09task2b_noise.png')
+else:
+    plt.show()
@@ -1,16 +1,21 @@
 import random
+import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
 from collections import defaultdict
-from scipy.stats import beta as beta_dist
+from beta_posterior import BetaPosterior
+from event_sink import ConsoleSink, sink_from_env
 
 class Robot:
-    def __init__(self, platform, action_noise=0.0, sensor_noise=0.0):
+    def __init__(self, platform, action_noise=0.0, sensor_noise=0.0, sink=None):
         self.platform = platform
+        # Messages and step events go to the sink (console output by default)
+        self.sink = sink or ConsoleSink()
         self.position = 0  
-        # Alpha is for 'black', Beta is for 'white'
-        self.alpha = defaultdict(int, {i: 1 for i in range(len(platform))})  
-        self.beta = defaultdict(int, {i: 1 for i in range(len(platform))})  
+        # Alpha is for 'black', Beta is for 'white' (count arrays of the posterior, per position)
+        self.posterior = BetaPosterior.uniform(len(platform))
+        self.alpha = self.posterior.alpha
+        self.beta = self.posterior.beta
         self.noise_action = action_noise
         self.noise_sensor = sensor_noise
         self.visit_count = defaultdict(int) 
@@ -32,10 +37,8 @@ class Robot:
 
     def update_histogram(self):
         perceived_color = self.sensing_color()
-        if perceived_color == 'black':
-            self.alpha[self.position] += 1
-        else:
-            self.beta[self.position] += 1
+        self.read_color = perceived_color
+        self.posterior.observe(self.position, perceived_color == 'black')
 
     def predict_color(self, position):
         if position < 0 or position >= len(self.platform):
@@ -61,10 +64,8 @@ class Robot:
     def calculate_delta(self, position):
         if position < 0 or position >= len(self.platform):
             return float('inf')  
-        a = self.alpha[position]
-        b = self.beta[position]
-        variance = beta_dist.var(a, b)
-        mean = beta_dist.mean(a, b)
+        variance = self.posterior.variance[position]
+        mean = self.posterior.mean[position]
         last_measurement = 0 if self.platform[self.position] == 'white' else 1
         return variance * abs(last_measurement - mean)
 
@@ -81,30 +82,35 @@ class Robot:
             error = 1 if predicted_color != actual_color else 0
             all_errors.append(error)
 
-            print("------------------------------------")
-            print(f"Step {step + 1}")
-            print(f"Current position: {self.position}, Predicted color: {predicted_color}, Actual color: {actual_color}")
+            self.sink.record(strategy=strategy, action_noise=self.noise_action, sensor_noise=self.noise_sensor,
+                             step=step + 1, action=action, position=self.position, tile=actual_color,
+                             perceived=self.read_color, predicted=predicted_color, error=bool(error))
+
+            self.sink.log("------------------------------------")
+            self.sink.log(f"Step {step + 1}")
+            self.sink.log(f"Current position: {self.position}, Predicted color: {predicted_color}, Actual color: {actual_color}")
             if predicted_color != actual_color:
-                print("Prediction was incorrect!")
+                self.sink.log("Prediction was incorrect!")
             else:
-                print("Prediction was correct.")
-            print(f"The robot is on the {actual_color} tile at position {self.position}.")
-            print(f"Histogram for position {self.position}:")
-            print(f"  Black: alpha = {self.alpha[self.position]}")
-            print(f"  White: beta = {self.beta[self.position]}")
-            print("------------------------------------")
+                self.sink.log("Prediction was correct.")
+            self.sink.log(f"The robot is on the {actual_color} tile at position {self.position}.")
+            self.sink.log(f"Histogram for position {self.position}:")
+            self.sink.log(f"  Black: alpha = {self.alpha[self.position]}")
+            self.sink.log(f"  White: beta = {self.beta[self.position]}")
+            self.sink.log("------------------------------------")
 
         return all_positions, all_errors
 
 def plot_beta_and_visit_patterns(alpha, beta, visit_counts, platform, title, ax1, ax2):
     visited_positions = [pos for pos in range(len(alpha)) if visit_counts[pos] > 0]
     x = np.linspace(0, 1, 100)
+    # Densities of all positions in one batched evaluation
+    densities = BetaPosterior(alpha, beta).pdf_grid(x)
     
     for pos in visited_positions:
         a = alpha[pos]
         b = beta[pos]
-        y = beta_dist.pdf(x, a, b)
-        ax1.plot(x, y, label=f'Position {pos} (α={a}, β={b})')
+        ax1.plot(x, densities[pos], label=f'Position {pos} (α={a}, β={b})')
 
     ax1.set_xlabel('Probability')
     ax1.set_ylabel('Density')
@@ -120,17 +126,18 @@ def plot_beta_and_visit_patterns(alpha, beta, visit_counts, platform, title, ax1
     ax2.set_xticks(range(len(visit_counts)))
     ax2.grid(True, axis='y')
 
-def compare_strategies(platform, steps, noise_levels):
+def compare_strategies(platform, steps, noise_levels, sink=None):
     strategies = ['cautious', 'adventurous']
+    sink = sink or ConsoleSink()
     
     for strategy in strategies:
-        print(f"Running simulation for {strategy.capitalize()} strategy...")
+        sink.log(f"Running simulation for {strategy.capitalize()} strategy...")
         fig, axs = plt.subplots(len(noise_levels), 2, figsize=(15, 7 * len(noise_levels)))
         fig.suptitle(f'{strategy.capitalize()} Strategy: Beta Distributions and Visitation Patterns')
 
         for i, noise_level in enumerate(noise_levels):
-            print(f"Simulating with noise level: {noise_level}")
-            robot = Robot(platform, action_noise=noise_level, sensor_noise=noise_level)
+            sink.log(f"Simulating with noise level: {noise_level}")
+            robot = Robot(platform, action_noise=noise_level, sensor_noise=noise_level, sink=sink)
             positions, errors = robot.simulate(steps, strategy=strategy)
             alpha, beta = robot.alpha, robot.beta
             visit_counts = [robot.visit_count[pos] for pos in range(len(platform))]
@@ -139,10 +146,17 @@ def compare_strategies(platform, steps, noise_levels):
             axs[i, 0].legend(loc='upper right', bbox_to_anchor=(-0.1, 1))
 
         plt.subplots_adjust(left=0.2, right=0.9, bottom=0.1, top=0.9, hspace=0.6, wspace=0.3)
-        plt.show()
+        if matplotlib.get_backend().lower() == 'agg':  # headless run (MPLBACKEND=Agg)
+            fig.savefig(f'ex09/ex09task2c_{strategy}.png')
+            plt.close(fig)
+        else:
+            plt.show()
 
 platform = ['white', 'black', 'white', 'white']
 steps = 20
 noise_levels = [0.0, 0.1, 0.4]
 
-compare_strategies(platform, steps, noise_levels)
+# EVENT_SINK=silent|ring|ndjson:<path> replaces the console output
+sink = sink_from_env()
+compare_strategies(platform, steps, noise_levels, sink)
+sink.close()
@@ -0,0 +1,125 @@
+import numpy as np
+from beta_posterior import beta_mean, beta_variance
+from event_sink import SilentSink
+
+# (row, column) steps of every move; connectivity 2 is the left/right of a 1D platform
+MOVE_STEPS = {'up': (-1, 0), 'down': (1, 0), 'left': (0, -1), 'right': (0, 1),
+              'up-left': (-1, -1), 'up-right': (-1, 1), 'down-left': (1, -1), 'down-right': (1, 1)}
+CONNECTIVITY = {2: ['left', 'right'], 4: ['up', 'down', 'left', 'right'], 8: list(MOVE_STEPS)}
+
+
+def random_tiles(height, width, n_colors, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    return rng.integers(0, n_colors, size=(height, width), dtype=np.int8)
+
+
+class GridWorld:
+    """One robot on an H x W floor of K colours, learning a Dirichlet posterior per cell.
+
+    `tiles` holds the colour index of every cell and `counts` the (H, W, K) Dirichlet
+    counts, all starting at `prior`. The robot moves 2- (left/right), 4- or 8-connected
+    and stays put at the border. Action noise replaces the chosen move by a random
+    other one; sensor noise reports a random other colour. A step only touches the robot's
+    neighbourhood, so its cost does not grow with the grid size.
+    """
+
+    def __init__(self, tiles, n_colors=None, connectivity=4, action_noise=0.0, sensor_noise=0.0,
+                 prior=1, start=(0, 0), colors=None, rng=None, sink=None):
+        if connectivity not in CONNECTIVITY:
+            raise ValueError(f"connectivity must be 2, 4 or 8, not {connectivity}")
+        self.tiles = np.asarray(tiles)
+        self.n_colors = int(self.tiles.max()) + 1 if n_colors is None else n_colors
+        self.colors = colors or [str(k) for k in range(self.n_colors)]
+        self.move_names = CONNECTIVITY[connectivity]
+        self.moves = np.array([MOVE_STEPS[name] for name in self.move_names])
+        self.action_noise = action_noise
+        self.sensor_noise = sensor_noise
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.sink = sink or SilentSink()
+        self.counts = np.full(self.tiles.shape + (self.n_colors,), prior, dtype=np.int32)
+        self.shape = np.array(self.tiles.shape)
+        self.position = np.array(start)
+        self.last_measurement = int(self.tiles[tuple(self.position)])
+
+    @classmethod
+    def from_platform(cls, platform, **options):
+        # A 1D ex09 platform (list of colour names) as a 1 x n grid with left/right moves
+        colors = ['white', 'black'] if set(platform) <= {'white', 'black'} else sorted(set(platform))
+        tiles = np.array([[colors.index(color) for color in platform]])
+        return cls(tiles, len(colors), connectivity=2, colors=colors, **options)
+
+    def neighbours(self, position=None):
+        # Cell reached by every move, clipped at the border: (n_moves, 2)
+        position = self.position if position is None else position
+        return np.clip(position + self.moves, 0, self.shape - 1)
+
+    def calculate_delta(self, cells):
+        """Task 2c's variance * |measurement - mean| for the given (n, 2) cells, summed over colours.
+
+        Each colour's Dirichlet marginal is Beta(alpha_k, alpha_0 - alpha_k); the
+        measurement is the one-hot vector of the last perceived colour.
+        """
+        alpha = self.counts[cells[:, 0], cells[:, 1]]
+        rest = alpha.sum(axis=1, keepdims=True) - alpha
+        measurement = np.arange(self.n_colors) == self.last_measurement
+        return (beta_variance(alpha, rest) * np.abs(measurement - beta_mean(alpha, rest))).sum(axis=1)
+
+    def choose_action(self, strategy='cautious'):
+        # Move to the neighbour with the smallest (cautious) or largest (adventurous) delta, ties at random
+        delta = self.calculate_delta(self.neighbours())
+        best = delta.min() if strategy == 'cautious' else delta.max()
+        return int(self.rng.choice(np.flatnonzero(delta == best)))
+
+    def move(self, action):
+        if self.rng.random() < self.action_noise:
+            action = (action + self.rng.integers(1, len(self.moves))) % len(self.moves)
+        self.position = np.clip(self.position + self.moves[action], 0, self.shape - 1)
+        return action
+
+    def sense(self):
+        color = int(self.tiles[tuple(self.position)])
+        if self.rng.random() < self.sensor_noise:
+            color = (color + self.rng.integers(1, self.n_colors)) % self.n_colors
+        return color
+
+    def predict_color(self, cell):
+        # Most likely colour of the cell (Dirichlet mean); ties go to the lowest colour index
+        return int(np.argmax(self.counts[tuple(cell)]))
+
+    def simulate(self, steps, strategy='cautious'):
+        """Returns the (steps, 2) positions and the per-step 0/1 prediction errors, as in task 2c."""
+        positions = np.empty((steps, 2), dtype=np.int64)
+        errors = np.empty(steps, dtype=np.int64)
+        for step in range(steps):
+            action = self.choose_action(strategy)
+            taken = self.move(action)
+            perceived = self.sense()
+            self.counts[tuple(self.position) + (perceived,)] += 1
+            self.last_measurement = perceived
+            tile = int(self.tiles[tuple(self.position)])
+            predicted = self.predict_color(self.position)
+            positions[step] = self.position
+            errors[step] = predicted != tile
+            self.sink.record(strategy=strategy, step=step + 1, action=self.move_names[action],
+                             taken=self.move_names[taken],
+                             position=self.position.tolist(), tile=self.colors[tile],
+                             perceived=self.colors[perceived], predicted=self.colors[predicted],
+                             error=bool(errors[step]))
+        return positions, errors
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    for size, n_colors, connectivity in ((4, 2, 4), (100, 3, 8), (1000, 4, 8)):
+        start = time.perf_counter()
+        world = GridWorld(random_tiles(size, size, n_colors, rng), n_colors, connectivity,
+                          action_noise=0.1, sensor_noise=0.1, start=(size // 2, size // 2), rng=rng)
+        created = time.perf_counter() - start
+        for strategy in ('cautious', 'adventurous'):
+            start = time.perf_counter()
+            positions, errors = world.simulate(10_000, strategy)
+            seconds = time.perf_counter() - start
+            print(f"{size}x{size}, {n_colors} colours, {connectivity}-connected, {strategy}: "
+                  f"setup {created:.3f} s, {1e6 * seconds / len(errors):.1f} us/step, error rate {errors.mean():.3f}")
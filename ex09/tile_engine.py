@@ -0,0 +1,177 @@
+from collections import namedtuple
+import numpy as np
+from beta_posterior import beta_mean, beta_variance
+
+# Tile colours as array values; counts[..., WHITE] / counts[..., BLACK] are the
+# 'white'/'black' histogram entries (beta/alpha in task 2c)
+WHITE, BLACK = 0, 1
+COLORS = {'white': WHITE, 'black': BLACK}
+
+# The three Robot variants of the exercise:
+# predict - task 2a: random walk, no action noise, histograms count the true colour
+# noise   - task 2b: cautious/adventurous moves, action and sensor noise 0.1
+# beta    - task 2c: Beta-distribution strategies with configurable noise
+MODELS = ('predict', 'noise', 'beta')
+DEFAULT_NOISE = {'predict': (0.0, 0.0), 'noise': (0.1, 0.1), 'beta': (0.0, 0.0)}
+CHUNK_EPISODES = 100_000
+
+# positions (N, steps) after every step, errors (N, steps) as each Robot.simulate
+# records them (NaN where it records nothing), counts (N, n_tiles, 2), visits (N, n_tiles)
+Episodes = namedtuple('Episodes', ['positions', 'errors', 'counts', 'visits'])
+
+
+def encode_platform(platform):
+    return np.array([COLORS[color] for color in platform], dtype=np.int64)
+
+
+def _sense(tiles, positions, sensor_noise, rng):
+    # Perceived colour: the true one, flipped with probability sensor_noise
+    return tiles[positions] ^ (rng.random(len(positions)) <= sensor_noise)
+
+
+def _delta_noise(counts, rows, positions, read_color):
+    # Robot.calculate_delta of task 2b
+    white, black = counts[rows, positions, WHITE], counts[rows, positions, BLACK]
+    total = white + black
+    p_white = white / total
+    return p_white * (1 - p_white) / (total + 1) * (read_color - p_white)
+
+
+def _delta_beta(counts, rows, positions, last_measurement):
+    # Robot.calculate_delta of task 2c: Beta(alpha=black, beta=white) variance times |x - mean|
+    a, b = counts[rows, positions, BLACK], counts[rows, positions, WHITE]
+    return beta_variance(a, b) * np.abs(last_measurement - beta_mean(a, b))
+
+
+def simulate_episodes(platform, n_robots, steps, model='predict', strategy='cautious',
+                      action_noise=None, sensor_noise=None, rng=None):
+    """Step `n_robots` independent robots of one exercise model at once for `steps` moves.
+
+    Every robot starts at tile 0 with all histogram counts at 1, like a fresh Robot.
+    The moves, the noise and the recorded errors follow the model's Robot.simulate;
+    see MODELS. Returns Episodes.
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown model: {model}")
+    rng = np.random.default_rng() if rng is None else rng
+    default_action, default_sensor = DEFAULT_NOISE[model]
+    action_noise = default_action if action_noise is None else action_noise
+    sensor_noise = default_sensor if sensor_noise is None else sensor_noise
+    tiles = encode_platform(platform)
+    n_tiles = len(tiles)
+    adventurous = strategy != 'cautious'
+
+    rows = np.arange(n_robots)
+    position = np.zeros(n_robots, dtype=np.int64)
+    counts = np.ones((n_robots, n_tiles, 2), dtype=np.int64)
+    visits = np.zeros((n_robots, n_tiles), dtype=np.int64)
+    positions = np.empty((n_robots, steps), dtype=np.int64)
+    errors = np.empty((n_robots, steps))
+    error = np.zeros(n_robots, dtype=np.int64)
+    # Task 2b senses once before the first step, that reading steers the first move
+    read_color = _sense(tiles, position, sensor_noise, rng) if model == 'noise' else None
+
+    for step in range(steps):
+        left = np.maximum(position - 1, 0)
+        right = np.minimum(position + 1, n_tiles - 1)
+        if model == 'predict':
+            # Forced off the ends, otherwise a fair coin
+            coin = np.where(rng.random(n_robots) < 0.5, -1, 1)
+            direction = np.where(position == 0, 1, np.where(position == n_tiles - 1, -1, coin))
+        elif model == 'noise':
+            delta_left = _delta_noise(counts, rows, left, read_color)
+            delta_right = _delta_noise(counts, rows, right, read_color)
+            coin = np.where(rng.random(n_robots) < 0.5, -1, 1)
+            smaller = np.where(delta_left < delta_right, -1, np.where(delta_right < delta_left, 1, coin))
+            direction = -smaller if adventurous else smaller
+        else:
+            last_measurement = tiles[position]
+            delta_left = _delta_beta(counts, rows, left, last_measurement)
+            delta_right = _delta_beta(counts, rows, right, last_measurement)
+            go_left = delta_left > delta_right if adventurous else delta_left < delta_right
+            direction = np.where(go_left, -1, 1)
+
+        if model != 'beta':
+            # Prediction for the intended tile, made before the move; off-platform tiles
+            # have the default 1/1 histogram, which predicts black
+            target = position + direction
+            inside = (target >= 0) & (target < n_tiles)
+            clipped = np.clip(target, 0, n_tiles - 1)
+            predicted = np.where(inside & (counts[rows, clipped, WHITE] > counts[rows, clipped, BLACK]), WHITE, BLACK)
+
+        # Action noise reverses the move; a blocked move (or reversal) stays put
+        flip = rng.random(n_robots) <= action_noise
+        if model == 'beta':
+            position = np.clip(position + np.where(flip, -direction, direction), 0, n_tiles - 1)
+        else:
+            moved = position + np.where(flip, -direction, direction)
+            position = np.where((moved >= 0) & (moved < n_tiles), moved, position)
+
+        if model == 'predict':
+            color = tiles[position]
+        else:
+            color = _sense(tiles, position, sensor_noise, rng)
+            read_color = color
+        counts[rows, position, color] += 1
+        visits[rows, position] += 1
+        positions[:, step] = position
+
+        if model == 'beta':
+            # Per-step 0/1 error of the prediction for the tile just sensed
+            a, b = counts[rows, position, BLACK], counts[rows, position, WHITE]
+            errors[:, step] = np.where(a / (a + b) > 0.5, BLACK, WHITE) != tiles[position]
+        else:
+            # Running error count over (positions reported + 1), skipped for off-platform targets
+            error += inside & (predicted != tiles[position])
+            errors[:, step] = np.where(inside, error / (step + 2), np.nan)
+    return Episodes(positions, errors, counts, visits)
+
+
+def error_curve(platform, n_episodes, steps, model='predict', strategy='cautious', action_noise=None,
+                sensor_noise=None, seed=0, chunk_size=CHUNK_EPISODES):
+    """Mean error curve (length `steps`) over `n_episodes` episodes, run in chunks of `chunk_size` robots.
+
+    Steps where a robot records no error (NaN) are left out of that step's mean.
+    """
+    rng = np.random.default_rng(seed)
+    total = np.zeros(steps)
+    recorded = np.zeros(steps, dtype=np.int64)
+    for first in range(0, n_episodes, chunk_size):
+        episodes = simulate_episodes(platform, min(chunk_size, n_episodes - first), steps, model, strategy,
+                                     action_noise, sensor_noise, rng)
+        valid = ~np.isnan(episodes.errors)
+        total += np.where(valid, episodes.errors, 0.0).sum(axis=0)
+        recorded += valid.sum(axis=0)
+    with np.errstate(invalid='ignore'):
+        return total / recorded
+
+
+if __name__ == "__main__":
+    import time
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    platform = ['white', 'black', 'white', 'white']
+    steps = 20
+    n_episodes = 1_000_000
+    runs = [('predict', 'cautious', None), ('noise', 'cautious', None), ('noise', 'adventurous', None),
+            ('beta', 'cautious', 0.1), ('beta', 'adventurous', 0.1)]
+
+    plt.figure(figsize=(10, 6))
+    for model, strategy, noise in runs:
+        start = time.perf_counter()
+        curve = error_curve(platform, n_episodes, steps, model, strategy, noise, noise)
+        seconds = time.perf_counter() - start
+        label = model if model == 'predict' else f'{model} ({strategy})'
+        print(f"{label}: {n_episodes} episodes in {seconds:.1f} s, final error {curve[-1]:.3f}")
+        plt.plot(range(1, steps + 1), curve, label=label)
+    plt.title(f'Mean error over {n_episodes} episodes')
+    plt.xticks(range(1, steps + 1))
+    plt.xlabel('Time Steps')
+    plt.ylabel('Error Rate')
+    plt.legend()
+    plt.tight_layout()
+    if matplotlib.get_backend().lower() == 'agg':  # headless run (MPLBACKEND=Agg)
+        plt.savefig('ex09/tile_engine.png')
+    else:
+        plt.show()
@@ -1,4 +1,5 @@
 import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 
 ## Free Parameters:
@@ -99,4 +100,7 @@ plt.xlabel("Time step")
 plt.ylabel("µ_m")
 
 plt.tight_layout()
-plt.show()
\ No newline at end of file
+if matplotlib.get_backend().lower() == 'agg':  # headless run (MPLBACKEND=Agg)
+    plt.savefig('ex10/Part2.png')
+else:
+    plt.show()
\ No newline at end of file